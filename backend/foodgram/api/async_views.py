@@ -0,0 +1,69 @@
+"""Read endpoints served off the event loop in the ASGI mode.
+
+Django 3.2 has no async ORM and DRF views are synchronous. Under ASGI
+Django runs a sync view in the one thread kept for thread sensitive
+code, so a process serves one request at a time. The read routes here
+are wrapped into async views that run the DRF view in a pool of
+ASYNC_READ_THREADS threads instead, while the event loop reads requests
+and writes responses: a slow client holds a socket, not a thread.
+Writes keep Django's default handling.
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern, URLResolver
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+READ_ROUTES = {
+    'tags-list', 'tags-detail', 'ingredients-list', 'ingredients-detail',
+    'recipes-list', 'recipes-detail',
+}
+
+executor = ThreadPoolExecutor(
+    settings.ASYNC_READ_THREADS, thread_name_prefix='reads'
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    # The request signals close connections of the handler thread only.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_reads(view):
+    """Async view running the reads of a sync view in the thread pool."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await sync_to_async(
+                run_view, thread_sensitive=False, executor=executor
+            )(view, request, *args, **kwargs)
+        return await sync_to_async(view)(request, *args, **kwargs)
+    return wrapper
+
+
+def with_async_reads(patterns):
+    """Copy of the URL patterns with the READ_ROUTES views wrapped."""
+    wrapped = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern, with_async_reads(pattern.url_patterns),
+                pattern.default_kwargs, pattern.app_name, pattern.namespace
+            )
+        elif isinstance(pattern, URLPattern) and pattern.name in READ_ROUTES:
+            pattern = URLPattern(
+                pattern.pattern, async_reads(pattern.callback),
+                pattern.default_args, pattern.name
+            )
+        wrapped.append(pattern)
+    return wrapped
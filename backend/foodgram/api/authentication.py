@@ -0,0 +1,166 @@
+"""Token authentication that remembers the users of recent tokens.
+
+TokenAuthentication joins Token and User on every request. Here users
+are kept by token key in a per-process LRU with a TTL and, when
+TOKEN_AUTH_SHARED_CACHE names a cache alias, in that cache as well.
+Entries are evicted when a token is deleted (logout) and when a user is
+saved or deleted (password change, deactivation), see api.signals. The
+eviction reaches the local LRU of the current process and the shared
+cache; other processes keep their local entry for at most
+TOKEN_AUTH_LOCAL_TTL seconds.
+"""
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from foodgram.db.routers import primary
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+SHARED_KEY = 'auth:token:{}'
+
+
+class TokenUserCache:
+    """Concrete field values of users by token key."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.keys_by_user = {}
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @property
+    def shared(self):
+        alias = settings.TOKEN_AUTH_SHARED_CACHE
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def shared_key(key):
+        return SHARED_KEY.format(sha256(key.encode()).hexdigest())
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > monotonic():
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+        shared = self.shared
+        values = shared.get(self.shared_key(key)) if shared else None
+        with self.lock:
+            if values is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+        self.remember(key, values)
+        return values
+
+    def remember(self, key, values):
+        with self.lock:
+            self.entries[key] = (monotonic() + self.ttl, values)
+            self.entries.move_to_end(key)
+            self.keys_by_user.setdefault(values['id'], set()).add(key)
+            while len(self.entries) > self.size:
+                old_key, (_, old_values) = self.entries.popitem(last=False)
+                self.keys_by_user.get(old_values['id'], set()).discard(
+                    old_key
+                )
+
+    def set(self, key, values, generation):
+        """Store values read from the database at `generation`.
+
+        Values read before an eviction that happened since are dropped,
+        they may be the ones the eviction was meant to remove.
+        """
+        if generation != self.generation:
+            return
+        self.remember(key, values)
+        shared = self.shared
+        if shared:
+            shared.set(
+                self.shared_key(key), values, settings.TOKEN_AUTH_SHARED_TTL
+            )
+
+    def evict(self, *keys):
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                entry = self.entries.pop(key, None)
+                if entry is not None:
+                    self.keys_by_user.get(entry[1]['id'], set()).discard(key)
+                    self.stats['evictions'] += 1
+        shared = self.shared
+        if shared and keys:
+            shared.delete_many([self.shared_key(key) for key in keys])
+
+    def evict_user(self, user_id):
+        """Evict all tokens of the user, known locally or stored."""
+        with self.lock:
+            keys = set(self.keys_by_user.pop(user_id, ()))
+        keys.update(
+            Token.objects.filter(user_id=user_id).values_list(
+                'key', flat=True
+            )
+        )
+        self.evict(*keys)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_user.clear()
+
+
+token_users = TokenUserCache(
+    settings.TOKEN_AUTH_LOCAL_SIZE, settings.TOKEN_AUTH_LOCAL_TTL
+)
+
+
+def user_values(user):
+    """Concrete field values of the user to remember.
+
+    The password hash is left out, and so are the counters, which change
+    through F() updates that do not evict the cache; both are deferred
+    on the rebuilt user and read from the database if needed.
+    """
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields
+        if field.attname not in ('password', *User.counter_fields)
+    }
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication answering from token_users.
+
+    Every request gets its own User instance, built from the cached
+    field values, so nothing set on it leaks into other requests. The
+    fields left out of the cache are deferred.
+    """
+
+    def authenticate_credentials(self, key):
+        generation = token_users.generation
+        values = token_users.get(key)
+        if values is None:
+            # Not from a replica, a lagging one would be remembered.
+            with primary():
+                user, token = super().authenticate_credentials(key)
+            token_users.set(key, user_values(user), generation)
+            return user, token
+        user = User.from_db(
+            router.db_for_read(User), list(values), list(values.values())
+        )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, Token(key=key, user=user)
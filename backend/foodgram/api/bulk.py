@@ -0,0 +1,187 @@
+"""Bulk recipe import and export as NDJSON, one recipe per line.
+
+A line looks like
+{"name": ..., "text": ..., "cooking_time": 10, "image": ...,
+ "author": "username", "tags": ["breakfast"],
+ "ingredients": [{"name": ..., "measurement_unit": "г", "amount": 100}]}
+where image is a base64 data URI or a path already in the media storage
+and author defaults to the importing user. Export writes the same format.
+"""
+import json
+from collections import Counter
+
+from api.cache import invalidate
+from api.serializers import RecipeImportSerializer
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Prefetch
+from recepies.feed import fan_out_many
+from recepies.images import schedule
+from recepies.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 500
+
+
+class Catalog:
+    """Ingredients, tags and authors of an import looked up by name."""
+
+    def __init__(self, default_author):
+        self.default_author = default_author
+        self.ingredients = {}
+        self.ingredients_by_name = {}
+        for pk, name, units in Ingredient.objects.values_list(
+            'pk', 'name', 'units'
+        ):
+            self.ingredients[name.casefold(), units.casefold()] = pk
+            self.ingredients_by_name.setdefault(name.casefold(), set()).add(pk)
+        self.tags = dict(Tag.objects.values_list('slug', 'pk'))
+        self.authors = {default_author.username: default_author.pk}
+
+    def ingredient_id(self, name, units=None):
+        """Id of the ingredient, None if unknown or ambiguous."""
+        if units is not None:
+            return self.ingredients.get((name.casefold(), units.casefold()))
+        found = self.ingredients_by_name.get(name.casefold(), ())
+        return next(iter(found)) if len(found) == 1 else None
+
+    def tag_id(self, slug):
+        return self.tags.get(slug)
+
+    def author_id(self, username):
+        if username not in self.authors:
+            self.authors[username] = User.objects.filter(
+                username=username
+            ).values_list('pk', flat=True).first()
+        return self.authors[username]
+
+
+def line_error(number, errors):
+    return {'line': number, 'errors': errors}
+
+
+def import_recipes(lines, default_author, batch_size=BATCH_SIZE):
+    """Validate and insert NDJSON recipe lines in batched transactions.
+
+    Returns the number of created recipes and the errors by line number;
+    invalid lines are skipped, the rest of the input is still imported.
+    """
+    catalog = Catalog(default_author)
+    report = {'created': 0, 'errors': []}
+    batch = []
+    for number, line in enumerate(lines, 1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            data = json.loads(line)
+        except ValueError as error:
+            report['errors'].append(line_error(
+                number, {'non_field_errors': [f'Неверный JSON: {error}']}
+            ))
+            continue
+        serializer = RecipeImportSerializer(
+            data=data, context={'catalog': catalog}
+        )
+        if not serializer.is_valid():
+            report['errors'].append(line_error(number, serializer.errors))
+            continue
+        batch.append((number, serializer.validated_data))
+        if len(batch) >= batch_size:
+            save_batch(batch, catalog, report)
+            batch = []
+    if batch:
+        save_batch(batch, catalog, report)
+    return report
+
+
+def save_batch(batch, catalog, report):
+    try:
+        with transaction.atomic():
+            recipes = [
+                Recipe(
+                    author_id=data.get('author', catalog.default_author.pk),
+                    name=data['name'],
+                    text=data['text'],
+                    cooking_time=data['cooking_time'],
+                    image=data['image'],
+                )
+                for _, data in batch
+            ]
+            insert_recipes(recipes)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredients_id=pk, amount=amount
+                )
+                for recipe, (_, data) in zip(recipes, batch)
+                for pk, amount in data['ingredients'].items()
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=pk)
+                for recipe, (_, data) in zip(recipes, batch)
+                for pk in set(data.get('tags', ()))
+            )
+    except DatabaseError as error:
+        report['errors'].extend(
+            line_error(number, {'non_field_errors': [str(error)]})
+            for number, _ in batch
+        )
+    else:
+        report['created'] += len(batch)
+
+
+def insert_recipes(recipes):
+    """Insert recipes with the effects of their post_save signals.
+
+    Backends that cannot return the ids of bulk inserted rows save the
+    recipes one by one and let the signals run.
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        for recipe in recipes:
+            recipe.save()
+        return
+    Recipe.objects.bulk_create(recipes)
+    authors = Counter(recipe.author_id for recipe in recipes)
+    for author_id, count in authors.items():
+        User.objects.filter(pk=author_id).update(
+            recipes_count=F('recipes_count') + count
+        )
+    fan_out_many(recipes)
+    for recipe in recipes:
+        schedule(recipe)
+    invalidate('recipes')
+
+
+def export_recipes(chunk_size=EXPORT_CHUNK_SIZE):
+    """NDJSON lines of the whole catalog, read in chunks by id."""
+    queryset = Recipe.objects.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related('ingredients')
+        )
+    ).order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        for recipe in chunk:
+            yield json.dumps({
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'image': recipe.image.name,
+                'author': recipe.author.username,
+                'tags': [tag.slug for tag in recipe.tags.all()],
+                'ingredients': [
+                    {
+                        'name': item.ingredients.name,
+                        'measurement_unit': item.ingredients.units,
+                        'amount': item.amount,
+                    }
+                    for item in recipe.recipeingredient_set.all()
+                ],
+            }, ensure_ascii=False) + '\n'
+        last_pk = chunk[-1].pk
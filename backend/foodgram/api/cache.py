@@ -0,0 +1,142 @@
+import time
+from hashlib import sha1
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}'
+RECIPE_KEY = 'api:recipe:{}:{}'
+STATS_KEYS = {'hits': 'api:stats:hits', 'misses': 'api:stats:misses'}
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def new_version():
+    """Version token of a cache tag; doubles as its change timestamp."""
+    return str(time.time_ns())
+
+
+def version_timestamp(version):
+    return int(version) / 10 ** 9
+
+
+def get_versions(tags):
+    """Current version of every tag, creating the missing ones."""
+    cache = get_cache()
+    keys = {tag: VERSION_KEY.format(tag) for tag in set(tags)}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        if key not in found:
+            cache.add(key, new_version(), None)
+            found[key] = cache.get(key)
+        versions[tag] = found[key]
+    return versions
+
+
+def get_current_versions(tags):
+    """Current version of every tag, None for the unknown ones."""
+    keys = {tag: VERSION_KEY.format(tag) for tag in set(tags)}
+    found = get_cache().get_many(keys.values())
+    return {tag: found.get(key) for tag, key in keys.items()}
+
+
+def versions_match(versions, current=None):
+    if not versions:
+        return True
+    if current is None:
+        current = get_current_versions(versions)
+    return all(current.get(tag) == versions[tag] for tag in versions)
+
+
+def invalidate(*tags):
+    """Bump the version of the tags once the current transaction commits.
+
+    Entries are checked against the versions stored in the shared cache
+    on every read, so the bump is seen by all workers at once.
+    """
+    def bump():
+        get_cache().set_many(
+            {VERSION_KEY.format(tag): new_version() for tag in tags}, None
+        )
+    transaction.on_commit(bump)
+
+
+def recipe_tags(recipe):
+    """Tags a serialized recipe depends on."""
+    tags = {f"recipe:{recipe['id']}"}
+    if 'author' in recipe:
+        tags.add(f"user:{recipe['author']['id']}")
+    if 'ingredients' in recipe:
+        tags.add('ingredients')
+    tags.update(f"tag:{tag['id']}" for tag in recipe.get('tags', ()))
+    return tags
+
+
+def fields_key(fields):
+    return sha1(','.join(sorted(fields)).encode()).hexdigest()[:12]
+
+
+def get_recipe_payloads(ids, fields):
+    """Still valid shared payloads of the recipes, by recipe id."""
+    key = fields_key(fields)
+    found = get_cache().get_many([RECIPE_KEY.format(pk, key) for pk in ids])
+    if not found:
+        return {}
+    current = get_current_versions(
+        tag for entry in found.values() for tag in entry['versions']
+    )
+    return {
+        entry['data']['id']: entry['data']
+        for entry in found.values()
+        if versions_match(entry['versions'], current)
+    }
+
+
+def set_recipe_payloads(payloads, fields, versions):
+    key = fields_key(fields)
+    versions = dict(versions)
+    versions.update(get_versions(
+        set().union(*map(recipe_tags, payloads)) - versions.keys()
+    ))
+    get_cache().set_many({
+        RECIPE_KEY.format(payload['id'], key): {
+            'versions': {tag: versions[tag] for tag in recipe_tags(payload)},
+            'data': payload,
+        }
+        for payload in payloads
+    }, settings.API_CACHE_TIMEOUT)
+
+
+def response_key(request):
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in sorted(request.query_params.getlist(key))
+    )
+    raw = f'{request.path}?{urlencode(params)}'
+    return RESPONSE_KEY.format(sha1(raw.encode()).hexdigest())
+
+
+def count(name):
+    cache = get_cache()
+    key = STATS_KEYS[name]
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_stats():
+    found = get_cache().get_many(STATS_KEYS.values())
+    return {name: found.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def reset_stats():
+    get_cache().delete_many(STATS_KEYS.values())
@@ -1,7 +1,17 @@
 import django_filters
+from api.ingredient_index import get_index
+from django.conf import settings
 from recepies.models import Recipe, Tag
+from recepies.search import search_recipes
 from rest_framework import filters
 
+RECIPE_ORDERINGS = {
+    'pub_date': ('pub_date', 'id'),
+    '-pub_date': ('-pub_date', '-id'),
+    'favorites': ('favorites_count', 'pub_date', 'id'),
+    '-favorites': ('-favorites_count', '-pub_date', '-id'),
+}
+
 
 class RecipeFilter(django_filters.FilterSet):
     tags = django_filters.ModelMultipleChoiceFilter(
@@ -12,11 +22,41 @@ class RecipeFilter(django_filters.FilterSet):
     author = django_filters.CharFilter(
         field_name='author__id'
     )
+    search = django_filters.CharFilter(method='filter_search')
+    ordering = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author']
+        fields = ['tags', 'author', 'search', 'ordering']
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
 
 
-class IngredientFilter(filters.SearchFilter):
+class IngredientFilter(filters.BaseFilterBackend):
+    """Ranked ingredient autocomplete served from the in-memory index.
+
+    `?name=` matches name prefixes first and then substrings, case
+    insensitively; `?limit=` caps the number of results.
+    """
     search_param = 'name'
+    limit_param = 'limit'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param)
+        if not query or view.action != 'list':
+            return queryset
+        return get_index().search(query, self.get_limit(request))
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_param])
+        except (KeyError, ValueError):
+            return settings.INGREDIENT_SEARCH_LIMIT
+        return limit if limit > 0 else settings.INGREDIENT_SEARCH_LIMIT
@@ -0,0 +1,103 @@
+from bisect import bisect_left, bisect_right
+from heapq import nsmallest
+from threading import Lock
+
+from api.cache import get_versions
+from django.db import DatabaseError, connections
+from recepies.models import Ingredient
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+class IngredientIndex:
+    """Sorted in-memory index of ingredient names.
+
+    Prefix lookups are two binary searches over the casefolded names,
+    substring lookups run str.find over all names joined into one string;
+    neither touches the database.
+    """
+
+    def __init__(self, rows):
+        self.entries = sorted(
+            (name.casefold(), pk, name, units) for pk, name, units in rows
+        )
+        self.keys = [entry[0] for entry in self.entries]
+        self.text = '\n'.join(self.keys)
+        self.offsets = []
+        offset = 0
+        for key in self.keys:
+            self.offsets.append(offset)
+            offset += len(key) + 1
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, query, limit=None):
+        """Ingredient rows matching the query, best matches first.
+
+        Exact matches come first, then names starting with the query,
+        names with a word starting with it and names containing it;
+        shorter names win within a group.
+        """
+        query = query.strip().casefold()
+        if not query or '\n' in query:
+            return []
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + chr(0x10ffff), start)
+        ranked = [
+            (EXACT if entry[0] == query else PREFIX, entry)
+            for entry in self.entries[start:end]
+        ]
+        found = self.text.find(query)
+        while found != -1:
+            position = bisect_right(self.offsets, found) - 1
+            if not start <= position < end:
+                entry = self.entries[position]
+                word = self.text[found - 1] == ' '
+                ranked.append((WORD_PREFIX if word else SUBSTRING, entry))
+            next_entry = position + 1
+            if next_entry == len(self.offsets):
+                break
+            found = self.text.find(query, self.offsets[next_entry])
+        ranked = nsmallest(
+            len(ranked) if limit is None else limit, ranked,
+            key=lambda item: (item[0], len(item[1][0]), item[1][0])
+        )
+        return [
+            {'id': pk, 'name': name, 'units': units}
+            for _, (_, pk, name, units) in ranked
+        ]
+
+
+_lock = Lock()
+_indexes = {}
+
+
+def get_index():
+    """Process-wide index, rebuilt when the ingredient catalog changes.
+
+    The catalog version is shared by all workers through the API cache
+    and bumped by the ingredient signals, so every process notices an
+    import or an admin edit on its next lookup.
+    """
+    version = get_versions(['ingredients'])['ingredients']
+    index = _indexes.get(version)
+    if index is not None:
+        return index
+    with _lock:
+        if version not in _indexes:
+            _indexes.clear()
+            _indexes[version] = IngredientIndex(
+                Ingredient.objects.values_list('id', 'name', 'units')
+            )
+        return _indexes[version]
+
+
+def warm_up():
+    """Build the index when a worker starts, if the database is ready."""
+    try:
+        get_index()
+    except DatabaseError:
+        pass
+    finally:
+        connections.close_all()
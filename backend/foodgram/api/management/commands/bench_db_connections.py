@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.utils import load_backend
+from foodgram.db import BACKENDS
+from foodgram.db.pool import get_pool, get_stats
+
+MODES = {
+    'connection per request': {'CONN_MAX_AGE': 0},
+    'persistent': {'CONN_MAX_AGE': None},
+    'persistent, health checks': {
+        'CONN_MAX_AGE': None, 'HEALTH_CHECKS': True
+    },
+    'pool, health checks': {'CONN_MAX_AGE': 0, 'HEALTH_CHECKS': True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the database overhead per request of the connection '
+        'settings, with the request cycle of Django run by several threads.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--pool-size', type=int, default=4,
+            help='Connections shared by the threads in the pool mode.'
+        )
+        parser.add_argument(
+            '--queries', type=int, default=3, help='Queries per request.'
+        )
+
+    def handle(self, *args, **options):
+        backend = load_backend(BACKENDS[connection.vendor])
+        for index, (name, overrides) in enumerate(MODES.items()):
+            settings_dict = {
+                **connection.settings_dict, 'HEALTH_CHECKS': False,
+                'POOL': None, **overrides
+            }
+            if name.startswith('pool'):
+                settings_dict['POOL'] = {'SIZE': options['pool_size']}
+            alias = f'bench-{index}'
+            self.measure(
+                name, lambda: backend.DatabaseWrapper(settings_dict, alias),
+                options
+            )
+            if settings_dict['POOL']:
+                get_pool(alias, settings_dict['POOL']).clear()
+            stats = get_stats()[alias]
+            self.stdout.write('  ' + ', '.join(
+                f'{key}: {value}' for key, value in stats.items()
+            ))
+
+    def measure(self, name, create_wrapper, options):
+        per_thread = options['requests'] // options['threads']
+
+        def serve():
+            wrapper = create_wrapper()
+            try:
+                for _ in range(per_thread):
+                    # What close_old_connections() does around a request.
+                    wrapper.close_if_unusable_or_obsolete()
+                    for _ in range(options['queries']):
+                        with wrapper.cursor() as cursor:
+                            cursor.execute('SELECT 1')
+                            cursor.fetchone()
+                    wrapper.close_if_unusable_or_obsolete()
+            finally:
+                wrapper.close()
+
+        started = perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            for future in [
+                executor.submit(serve) for _ in range(options['threads'])
+            ]:
+                future.result()
+        spent = perf_counter() - started
+        count = per_thread * options['threads']
+        self.stdout.write(
+            f'{name}: {spent / count * 10 ** 6:.1f} us/request, '
+            f'{count / spent:.0f} requests/s'
+        )
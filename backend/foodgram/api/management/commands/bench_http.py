@@ -0,0 +1,118 @@
+import asyncio
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test a running server: GET the URLs from concurrent clients '
+        'for a while and report requests/s and latency percentiles. Slow '
+        'clients sending their request a byte per second can be added to '
+        'compare the sync and ASGI modes under them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--slow-clients', type=int, default=0)
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help='Extra request header, e.g. "Authorization: Token ...".'
+        )
+
+    def handle(self, *args, **options):
+        latencies, errors, spent = asyncio.run(self.run(options))
+        self.stdout.write(
+            f'{len(latencies)} requests in {spent:.1f} s, '
+            f'{len(latencies) / spent:.0f} requests/s, {errors} errors'
+        )
+        if latencies:
+            self.stdout.write(
+                f'latency p50: {percentile(latencies, 0.5) * 1000:.1f} ms, '
+                f'p99: {percentile(latencies, 0.99) * 1000:.1f} ms, '
+                f'max: {max(latencies) * 1000:.1f} ms'
+            )
+
+    async def run(self, options):
+        requests = [
+            self.build_request(url, options) for url in options['urls']
+        ]
+        latencies = []
+        errors = 0
+
+        async def client(index):
+            nonlocal errors
+            while perf_counter() < deadline:
+                host, port, request = requests[index % len(requests)]
+                index += 1
+                started = perf_counter()
+                try:
+                    status = await self.fetch(host, port, request)
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    status = None
+                if status == 200:
+                    latencies.append(perf_counter() - started)
+                else:
+                    errors += 1
+
+        slow = [
+            asyncio.create_task(self.slow_client(*requests[0][:2]))
+            for _ in range(options['slow_clients'])
+        ]
+        await asyncio.sleep(0.5 if slow else 0)
+        started = perf_counter()
+        deadline = started + options['duration']
+        await asyncio.gather(
+            *(client(index) for index in range(options['concurrency']))
+        )
+        spent = perf_counter() - started
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+        return latencies, errors, spent
+
+    @staticmethod
+    def build_request(url, options):
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        lines = [
+            f'GET {path} HTTP/1.1', f'Host: {parts.netloc}',
+            'Connection: close', *options['header'], '', ''
+        ]
+        return (
+            parts.hostname, parts.port or 80, '\r\n'.join(lines).encode()
+        )
+
+    @staticmethod
+    async def fetch(host, port, request):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+        finally:
+            writer.close()
+        return int(status_line.split()[1])
+
+    @staticmethod
+    async def slow_client(host, port):
+        """Hold a connection by never finishing the request headers."""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(b'GET / HTTP/1.1\r\nHost: x\r\n')
+                while True:
+                    writer.write(b'X')
+                    await writer.drain()
+                    await asyncio.sleep(1)
+            except OSError:
+                await asyncio.sleep(0.1)
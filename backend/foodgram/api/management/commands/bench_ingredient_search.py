@@ -0,0 +1,46 @@
+from timeit import timeit
+
+from api.ingredient_index import IngredientIndex
+from django.core.management.base import BaseCommand
+from recepies.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Compare ingredient autocomplete through the ORM and the index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=50)
+
+    def handle(self, *args, **options):
+        rows = list(Ingredient.objects.values_list('id', 'name', 'units'))
+        if not rows:
+            self.stderr.write('No ingredients, run import_data first.')
+            return
+        index = IngredientIndex(rows)
+        names = sorted({name for _, name, _ in rows})
+        step = max(len(names) // 10, 1)
+        queries = [
+            name[:length]
+            for name in names[::step] for length in (1, 2, 3, 5)
+        ]
+        rounds = options['rounds']
+        limit = options['limit']
+
+        def orm():
+            for query in queries:
+                list(Ingredient.objects.filter(name__istartswith=query))
+
+        def indexed():
+            for query in queries:
+                index.search(query, limit)
+
+        build = timeit(lambda: IngredientIndex(rows), number=10) / 10
+        self.stdout.write(
+            f'{len(rows)} ingredients, {len(queries)} queries, '
+            f'index build {build * 1000:.2f} ms'
+        )
+        for name, func in (('orm', orm), ('index', indexed)):
+            spent = timeit(func, number=rounds)
+            per_query = spent / rounds / len(queries) * 10 ** 6
+            self.stdout.write(f'{name:>6}: {per_query:9.1f} us/query')
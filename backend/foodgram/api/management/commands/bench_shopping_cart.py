@@ -0,0 +1,133 @@
+import tracemalloc
+from time import perf_counter
+
+from api.views import ShoppingCartDownloadView
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Sum
+from recepies.cart import rebuild_totals
+from recepies.models import Ingredient, Recipe, RecipeIngredient, ShoppingList
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_download(user):
+    """The download as it was before streaming: one string built by +=."""
+    ingredients = RecipeIngredient.objects.filter(
+        recipe__shopping_lists__user=user,
+    ).values(
+        name=F('ingredients__name'),
+        units=F('ingredients__units')
+    ).annotate(
+        total=Sum('amount')
+    )
+    ingredients_str = ''
+    for ingredient in ingredients:
+        ingredients_str += (
+            f"{ingredient['name']} ({ingredient['units']}) — "
+            f"{ingredient['total']}\n"
+        )
+    return ingredients_str.encode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure shopping cart downloads for a cart of many recipes. '
+        'All data is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self.create_cart(
+                    options['recipes'], options['ingredients_per_recipe']
+                )
+                self.measure('legacy', lambda: legacy_download(user))
+                for export_format in ('txt', 'csv', 'json', 'pdf'):
+                    self.measure(
+                        export_format,
+                        lambda: self.download(user, export_format)
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_cart(self, recipes_count, per_recipe):
+        user = User.objects.create(
+            username='cart-benchmark', email='cart-benchmark@example.com'
+        )
+        ingredients = list(Ingredient.objects.all()[:2000])
+        if len(ingredients) < per_recipe:
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'benchmark {index}', units='г')
+                for index in range(per_recipe)
+            )
+            ingredients = list(Ingredient.objects.all()[:2000])
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=user, name=f'benchmark {index}', text='',
+                cooking_time=1, image='recipes/images/benchmark.png'
+            )
+            for index in range(recipes_count)
+        )
+        recipes = list(Recipe.objects.filter(author=user))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredients=ingredients[
+                    (index * per_recipe + offset) % len(ingredients)
+                ],
+                amount=offset + 1
+            )
+            for index, recipe in enumerate(recipes)
+            for offset in range(per_recipe)
+        )
+        ShoppingList.objects.create(user=user).recipes.add(*recipes)
+        rebuild_totals([user.pk])
+        self.stdout.write(
+            f'cart of {recipes_count} recipes, '
+            f'{recipes_count * per_recipe} recipe ingredients'
+        )
+        return user
+
+    def download(self, user, export_format):
+        if export_format == 'pdf':
+            from api.shopping_cart import EXPORTERS
+            if 'pdf' not in EXPORTERS:
+                return b''
+        request = APIRequestFactory().get(
+            '/api/recipes/download_shopping_cart/', {'format': export_format}
+        )
+        force_authenticate(request, user=user)
+        response = ShoppingCartDownloadView.as_view()(request)
+        try:
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{export_format} download answered '
+                    f'{response.status_code}'
+                )
+            return sum(len(chunk) for chunk in response.streaming_content)
+        finally:
+            # Gives the admission control slot back.
+            response.close()
+
+    def measure(self, name, func):
+        tracemalloc.start()
+        started = perf_counter()
+        result = func()
+        spent = perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        size = result if isinstance(result, int) else len(result)
+        self.stdout.write(
+            f'{name:>7}: {spent * 1000:8.1f} ms, '
+            f'peak {peak / 1024:8.1f} KiB, {size} bytes'
+        )
@@ -0,0 +1,65 @@
+from time import perf_counter
+
+from api.authentication import CachedTokenAuthentication, token_users
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the authentication overhead per request with and without '
+        'the token cache. The user is created in a rolled back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = User.objects.create(
+                    username='auth-benchmark',
+                    email='auth-benchmark@example.com'
+                )
+                token = Token.objects.create(user=user)
+                factory = APIRequestFactory()
+                request = factory.get(
+                    '/api/users/me/', HTTP_AUTHORIZATION=f'Token {token.key}'
+                )
+                token_users.clear()
+                self.measure(
+                    'TokenAuthentication', TokenAuthentication, request,
+                    options['requests']
+                )
+                self.measure(
+                    'CachedTokenAuthentication', CachedTokenAuthentication,
+                    request, options['requests']
+                )
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(f'cache stats: {token_users.stats}')
+
+    def measure(self, name, authentication, request, count):
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            for _ in range(count):
+                user = Request(
+                    request, authenticators=[authentication()]
+                ).user
+            spent = perf_counter() - started
+        assert user.is_authenticated
+        self.stdout.write(
+            f'{name}: {spent / count * 10 ** 6:.1f} us/request, '
+            f'{len(queries) / count:.3f} queries/request'
+        )
@@ -0,0 +1,19 @@
+from api.bulk import export_recipes
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Export all recipes as NDJSON, see api.bulk for the format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='File to write to, stdout by default.'
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] is None:
+            for line in export_recipes():
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            output.writelines(export_recipes())
@@ -0,0 +1,41 @@
+import json
+import sys
+
+from api.bulk import BATCH_SIZE, import_recipes
+from django.core.management.base import BaseCommand, CommandError
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Import recipes from an NDJSON file, see api.bulk for the format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file, "-" for stdin.')
+        parser.add_argument(
+            '--author', required=True,
+            help='Username of the author of lines without one.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(username=options['author']).first()
+        if author is None:
+            raise CommandError(f"Unknown user {options['author']}")
+        if options['path'] == '-':
+            report = import_recipes(
+                sys.stdin.buffer, author, options['batch_size']
+            )
+        else:
+            with open(options['path'], 'rb') as lines:
+                report = import_recipes(
+                    lines, author, options['batch_size']
+                )
+        for error in report['errors']:
+            self.stderr.write(
+                f"line {error['line']}: "
+                + json.dumps(error['errors'], ensure_ascii=False)
+            )
+        self.stdout.write(
+            f"created: {report['created']}, "
+            f"errors: {len(report['errors'])}"
+        )
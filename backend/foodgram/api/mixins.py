@@ -0,0 +1,229 @@
+import json
+from hashlib import sha1
+
+from api.cache import (count, get_cache, get_recipe_payloads, get_versions,
+                       response_key, set_recipe_payloads, version_timestamp,
+                       versions_match)
+from api.relations import UserRelations
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from foodgram.db.routers import primary
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def make_etag(*parts):
+    return quote_etag(sha1(repr(parts).encode()).hexdigest())
+
+
+class CachedResponseMixin:
+    """Cache anonymous list and retrieve responses by path and query.
+
+    Every entry remembers the versions of the tags it depends on and is
+    served only while all of them are unchanged, so a write invalidates
+    just the responses that contain the changed objects. Tags of the
+    viewset itself are snapshotted before the response is built, which
+    keeps a write racing with the computation from being cached as fresh.
+    """
+    cache_list_tag = None
+    cache_object_tag = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, [self.cache_list_tag], request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, [self.get_object_cache_tag()],
+            request, *args, **kwargs
+        )
+
+    def get_object_cache_tag(self):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return f'{self.cache_object_tag}:{lookup}'
+
+    def get_cache_tags(self, data):
+        """Tags of the objects included in the response data."""
+        return []
+
+    def get_cached_response(self, handler, tags, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = response_key(request)
+        entry = cache.get(key)
+        if entry is not None and versions_match(entry['versions']):
+            count('hits')
+            headers = entry['headers']
+            response = get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    headers.get('Last-Modified')
+                )
+            )
+            if response is None:
+                response = Response(entry['data'], status=entry['status'])
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+        count('misses')
+        versions = get_versions(tags)
+        # A lagging replica would be cached as the current version.
+        with primary():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            versions.update(get_versions(
+                set(self.get_cache_tags(response.data)) - versions.keys()
+            ))
+            cache.set(key, {
+                'versions': versions,
+                'status': response.status_code,
+                'data': json.loads(JSONRenderer().render(response.data)),
+                'headers': {
+                    header: response[header]
+                    for header in VALIDATOR_HEADERS if header in response
+                },
+            }, settings.API_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """Answer GET with 304 while the client copy is still current.
+
+    ETag and Last-Modified are derived from version metadata that is
+    much cheaper than the response, so a matching If-None-Match or
+    If-Modified-Since skips serialization entirely.
+    """
+
+    def list(self, request, *args, **kwargs):
+        handler = super().list
+        return self.get_conditional_response(
+            request, *self.get_validators([self.cache_list_tag]),
+            lambda: handler(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        handler = super().retrieve
+        return self.get_conditional_response(
+            request, *self.get_validators([self.get_object_cache_tag()]),
+            lambda: handler(request, *args, **kwargs)
+        )
+
+    def get_validators(self, tags):
+        """ETag and Last-Modified of a response depending on the tags."""
+        versions = get_versions(tags)
+        etag = make_etag(
+            self.request.get_host(), response_key(self.request),
+            sorted(versions.items())
+        )
+        return etag, max(map(version_timestamp, versions.values()))
+
+    def get_conditional_response(self, request, etag, last_modified, build):
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified)
+        )
+        if response is None:
+            response = build()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class RecipePayloadMixin(ConditionalGetMixin):
+    """Serve recipes from shared payloads with per-user flags overlaid.
+
+    The serialized recipe is the same for every user apart from
+    is_favorited, is_in_shopping_cart and author.is_subscribed, so it is
+    cached once per recipe version and the flags of the requesting user
+    are filled in from their ID sets at response time.
+    """
+
+    def get_payload_queryset(self, fields):
+        """Queryset serializing the given fields of uncached recipes."""
+        return self.get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = list(queryset) if page is None else page
+        fields = tuple(self.get_serializer().fields)
+
+        def build():
+            data = self.get_recipe_payloads(recipes, fields)
+            if page is None:
+                return Response(data)
+            return self.get_paginated_response(data)
+
+        return self.get_conditional_response(
+            request, *self.get_recipe_validators(recipes, fields, ['recipes']),
+            build
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        fields = tuple(self.get_serializer().fields)
+
+        def build():
+            payloads = self.get_recipe_payloads([recipe], fields)
+            if not payloads:
+                raise Http404
+            return Response(payloads[0])
+
+        return self.get_conditional_response(
+            request, *self.get_recipe_validators([recipe], fields, []), build
+        )
+
+    def get_recipe_validators(self, recipes, fields, tags):
+        """Validators from updated_at of the recipes and tag versions."""
+        user = self.request.user
+        tags = set(tags) | {'tags', 'ingredients'}
+        tags.update(f'user:{recipe.author_id}' for recipe in recipes)
+        if user.is_authenticated:
+            tags.add(f'relations:{user.pk}')
+        versions = get_versions(tags)
+        etag = make_etag(
+            self.request.get_host(), response_key(self.request), user.pk,
+            fields,
+            [(recipe.pk, recipe.updated_at.isoformat()) for recipe in recipes],
+            sorted(versions.items())
+        )
+        last_modified = max(
+            [recipe.updated_at.timestamp() for recipe in recipes]
+            + [version_timestamp(version) for version in versions.values()]
+        )
+        return etag, last_modified
+
+    def get_recipe_payloads(self, recipes, fields):
+        ids = [recipe.pk for recipe in recipes]
+        payloads = get_recipe_payloads(ids, fields)
+        missing = [pk for pk in ids if pk not in payloads]
+        if missing:
+            versions = get_versions(f'recipe:{pk}' for pk in missing)
+            serializer = self.get_serializer(
+                self.get_payload_queryset(fields).filter(pk__in=missing),
+                many=True,
+                context={
+                    'request': self.request,
+                    'relations': UserRelations(AnonymousUser()),
+                }
+            )
+            with primary():
+                fresh = serializer.data
+            set_recipe_payloads(fresh, fields, versions)
+            payloads.update((payload['id'], payload) for payload in fresh)
+        relations = UserRelations(self.request.user)
+        # Recipes deleted since the list was read are left out.
+        return [
+            relations.overlay(payloads[pk]) for pk in ids if pk in payloads
+        ]
@@ -0,0 +1,125 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only keyset pagination over (pub_date, id), newest first.
+
+    Each page is a single indexed range scan, so deep pages cost the same
+    as the first one and no COUNT(*) is issued.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        results = self.get_results(
+            queryset, self.decode_cursor(request), self.page_size + 1
+        )
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_results(self, queryset, position, limit):
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+        return list(queryset[:limit])
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = b64decode(encoded.encode('ascii'), altchars=b'-_')
+            pub_date, pk = raw.decode('ascii').rsplit('|', 1)
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, obj):
+        raw = f'{obj.pub_date.isoformat()}|{obj.pk}'.encode('ascii')
+        return b64encode(raw, altchars=b'-_').decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(KeysetPagination):
+    """Keyset pagination over a recepies.feed.Feed instead of a queryset."""
+
+    def get_results(self, feed, position, limit):
+        return feed.page(position, limit)
+
+
+class RecipePagination(PageNumberPagination):
+    """Page numbers by default, keyset pagination once `cursor` is passed.
+
+    `?cursor=` with an empty value starts the keyset feed from the newest
+    recipe; the `next` link of every page carries the following cursor.
+    The keyset only follows the default order, so any other `ordering`
+    and a `search`, whose results are ranked, are paged by number.
+    """
+    keyset_class = KeysetPagination
+    ordering_query_param = 'ordering'
+    search_query_param = 'search'
+    keyset_orderings = ('', '-pub_date')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        params = request.query_params
+        if (
+            self.keyset_class.cursor_query_param in params
+            and params.get(self.ordering_query_param, '')
+            in self.keyset_orderings
+            and not params.get(self.search_query_param, '').strip()
+        ):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import AnonymousUser
+
+
+class UserRelations:
+    """Favorite, cart and subscription ID sets of a user.
+
+    The sets are those of the User instance (User.subscription_ids and
+    the like), each loaded with a single query the first time it is
+    needed. The requesting user is one instance per request, so every
+    serializer of a request shares them. Anonymous users get empty sets
+    without touching the database.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def favorite_ids(self):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return self.user.favorite_ids
+
+    @property
+    def cart_ids(self):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return self.user.cart_ids
+
+    @property
+    def subscription_ids(self):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return self.user.subscription_ids
+
+    def is_subscribed_to(self, author_id):
+        return (
+            author_id != self.user.pk
+            and author_id in self.subscription_ids
+        )
+
+    def overlay(self, recipe):
+        """Copy of a shared recipe payload with this user's flags set."""
+        recipe = dict(recipe)
+        if 'is_favorited' in recipe:
+            recipe['is_favorited'] = recipe['id'] in self.favorite_ids
+        if 'is_in_shopping_cart' in recipe:
+            recipe['is_in_shopping_cart'] = recipe['id'] in self.cart_ids
+        if 'author' in recipe:
+            author = recipe['author'] = dict(recipe['author'])
+            author['is_subscribed'] = self.is_subscribed_to(author['id'])
+        return recipe
+
+
+def get_relations(context):
+    """Relations given in a serializer context, else the requester's."""
+    relations = context.get('relations')
+    if relations is not None:
+        return relations
+    request = context.get('request')
+    return UserRelations(
+        request.user if request is not None else AnonymousUser()
+    )
@@ -1,11 +1,52 @@
+from api.relations import get_relations
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
 from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
 from drf_extra_fields.fields import Base64ImageField
-from recepies.models import (Ingredient, Recipe, RecipeIngredient,
+from recepies import cart, uploads
+from recepies.images import VARIANTS
+from recepies.models import (ImageUpload, Ingredient, Recipe, RecipeIngredient,
                              ShoppingList, Tag)
 from rest_framework import serializers
 from users.models import User
 
 
+def split_field_names(value):
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Serializer whose fields can be narrowed with `fields` and `omit`.
+
+    Views pass them from the `?fields=` / `?omit=` query parameters,
+    unknown names are ignored and `id` is always kept.
+    """
+    compact_fields = None
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - {'id'}:
+                self.fields.pop(name)
+        for name in set(omit or ()) - {'id'}:
+            self.fields.pop(name, None)
+
+    @classmethod
+    def get_fields_kwargs(cls, request, compact=False):
+        fields = split_field_names(request.query_params.get('fields'))
+        if fields is None and compact:
+            fields = cls.compact_fields
+        return {
+            'fields': fields,
+            'omit': split_field_names(request.query_params.get('omit')),
+        }
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     measurement_unit = serializers.CharField(source='units')
 
@@ -39,14 +80,11 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated and user != obj:
-            return user.is_subscribed_to(obj)
-        return False
+        return get_relations(self.context).is_subscribed_to(obj.pk)
 
     class Meta:
         model = User
@@ -56,15 +94,20 @@ class UserSerializer(serializers.ModelSerializer):
             )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    compact_fields = (
+        'id', 'tags', 'author', 'is_favorited', 'name', 'image',
+        'image_variants', 'cooking_time', 'is_in_shopping_cart'
+    )
     tags = TagSerializer(many=True)
     author = UserSerializer()
     ingredients = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     def get_ingredients(self, obj):
-        queryset = obj.ingredients.through.objects.filter(recipe=obj)
+        queryset = obj.recipeingredient_set.all()
         return [
             {
                 'id': ingredient.ingredients.id,
@@ -75,23 +118,31 @@ class RecipeSerializer(serializers.ModelSerializer):
             for ingredient in queryset
         ]
 
+    def get_image_variants(self, obj):
+        """URLs of the resized images, empty until they are built."""
+        request = self.context.get('request')
+        urls = {}
+        for name in VARIANTS:
+            path = obj.image_variants.get(name)
+            if path:
+                url = default_storage.url(path)
+                urls[name] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return urls
+
     def get_is_favorited(self, obj):
-        if not self.context['request'].user.is_authenticated:
-            return False
-        user = self.context['request'].user
-        return user.favorite_recipes.filter(pk=obj.pk).exists()
+        return obj.pk in get_relations(self.context).favorite_ids
 
     def get_is_in_shopping_cart(self, obj):
-        if not self.context['request'].user.is_authenticated:
-            return False
-        user = self.context['request'].user
-        return obj.shopping_lists.filter(user=user).exists()
+        return obj.pk in get_relations(self.context).cart_ids
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited', 'name',
-            'image', 'text', 'cooking_time', 'is_in_shopping_cart'
+            'image', 'image_variants', 'text', 'cooking_time',
+            'is_in_shopping_cart'
             )
 
 
@@ -101,20 +152,54 @@ class RecipeShortSerializer(RecipeSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class RecipeImageField(Base64ImageField):
+    """An image sent as a base64 string or as a multipart file."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return serializers.ImageField.to_internal_value(self, data)
+        return super().to_internal_value(data)
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
+    """A recipe sent as JSON or as multipart/form-data.
+
+    In a multipart form tags are repeated `tags` fields and ingredients
+    are `ingredients[0]id`, `ingredients[0]amount` and so on. Instead of
+    the image the id of a completed chunked upload can be sent as
+    `image_upload`.
+    """
     ingredients = IngredientAmountSerializer(many=True, required=True)
     tags = serializers.PrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all()
         )
-    image = Base64ImageField(required=False, allow_null=True)
+    image = RecipeImageField(required=False, allow_null=True)
+    image_upload = serializers.PrimaryKeyRelatedField(
+        queryset=ImageUpload.objects.all(), required=False, write_only=True
+        )
 
     class Meta:
         model = Recipe
         fields = (
-            'ingredients', 'tags', 'image', 'name', 'text', 'cooking_time',
-            'id'
+            'ingredients', 'tags', 'image', 'image_upload', 'name', 'text',
+            'cooking_time', 'id'
             )
 
+    def validate_image_upload(self, upload):
+        request = self.context.get('request')
+        if request is None or upload.user_id != request.user.pk:
+            raise serializers.ValidationError('Загрузка не найдена.')
+        if not upload.is_complete:
+            raise serializers.ValidationError('Загрузка не завершена.')
+        return upload
+
+    def validate(self, attrs):
+        if attrs.get('image') and 'image_upload' in attrs:
+            raise serializers.ValidationError(
+                'Передайте либо image, либо image_upload.'
+            )
+        return attrs
+
     @transaction.atomic
     def update(self, instance, validated_data):
         if 'name' in validated_data:
@@ -123,30 +208,18 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             instance.text = validated_data['text']
         if 'cooking_time' in validated_data:
             instance.cooking_time = validated_data['cooking_time']
+        self.take_upload(validated_data)
         if 'image' in validated_data:
             instance.image = validated_data['image']
         ingredient_amounts = validated_data.get('ingredients')
         if ingredient_amounts is not None:
-            recipe_ingredients = []
-            for ia in ingredient_amounts:
-                ingredient = ia['id']
-                amount = ia['amount']
-                recipe_ingredient, _ = (
-                    RecipeIngredient.objects.update_or_create(
-                        recipe=instance,
-                        ingredients=ingredient,
-                        defaults={'amount': amount}
-                    )
-                )
-                recipe_ingredients.append(recipe_ingredient)
-            RecipeIngredient.objects.filter(
-                recipe=instance
-            ).exclude(
-                id__in=[ri.id for ri in recipe_ingredients]
-            ).delete()
+            old_amounts = cart.lock_recipe(instance)
+            new_amounts = self.get_amounts(ingredient_amounts)
+            self.update_ingredients(instance, old_amounts, new_amounts)
+            cart.recipe_changed(instance, old_amounts, new_amounts)
         tags = validated_data.get('tags')
         if tags is not None:
-            instance.tags.set(tags)
+            self.update_tags(instance, {tag.pk for tag in tags})
         instance.save()
         return instance
 
@@ -154,20 +227,146 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         ingredient_amounts = validated_data.pop('ingredients')
         tags = validated_data.pop('tags', [])
+        self.take_upload(validated_data)
         recipe = Recipe.objects.create(**validated_data)
-        recipe.author = self.context['request'].user
-        recipe_ingredients = []
-        for ia in ingredient_amounts:
-            ingredient = ia['id']
-            amount = ia['amount']
-            recipe_ingredient = RecipeIngredient(
-                recipe=recipe, ingredients=ingredient, amount=amount
-            )
-            recipe_ingredients.append(recipe_ingredient)
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
-        recipe.tags.set(tags)
+        self.update_ingredients(
+            recipe, {}, self.get_amounts(ingredient_amounts)
+        )
+        self.update_tags(recipe, {tag.pk for tag in tags}, created=True)
         return recipe
 
+    @staticmethod
+    def take_upload(validated_data):
+        """Replace image_upload with its file, discarded after commit."""
+        upload = validated_data.pop('image_upload', None)
+        if upload is not None:
+            file = uploads.open_file(upload)
+            transaction.on_commit(lambda: uploads.discard(upload, file))
+            validated_data['image'] = file
+
+    @staticmethod
+    def get_amounts(ingredient_amounts):
+        """Amounts by ingredient id, the last one wins for duplicates."""
+        return {ia['id'].pk: int(ia['amount']) for ia in ingredient_amounts}
+
+    @staticmethod
+    def update_ingredients(recipe, old_amounts, new_amounts):
+        """Turn old amounts into new ones with one query per kind of change.
+
+        Bulk queries send no signals; the cached payloads of the recipe
+        are invalidated by the save of the recipe itself.
+        """
+        created = [
+            RecipeIngredient(recipe=recipe, ingredients_id=pk, amount=amount)
+            for pk, amount in new_amounts.items() if pk not in old_amounts
+        ]
+        changed = {
+            pk: amount for pk, amount in new_amounts.items()
+            if pk in old_amounts and old_amounts[pk] != amount
+        }
+        removed = old_amounts.keys() - new_amounts.keys()
+        if created:
+            RecipeIngredient.objects.bulk_create(created)
+        if changed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredients_id__in=changed
+            ).update(amount=Case(
+                *(
+                    When(ingredients_id=pk, then=Value(amount))
+                    for pk, amount in changed.items()
+                ),
+                output_field=IntegerField()
+            ))
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredients_id__in=removed
+            ).delete()
+
+    @staticmethod
+    def update_tags(recipe, tag_ids, created=False):
+        through = Recipe.tags.through
+        old_ids = set() if created else set(
+            through.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
+            )
+        )
+        through.objects.bulk_create(
+            through(recipe_id=recipe.pk, tag_id=pk)
+            for pk in tag_ids - old_ids
+        )
+        if old_ids - tag_ids:
+            through.objects.filter(
+                recipe=recipe, tag_id__in=old_ids - tag_ids
+            ).delete()
+
+
+class ImportIngredientSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField(required=False, allow_blank=True)
+    amount = serializers.FloatField(min_value=0)
+
+
+class RecipeImportSerializer(RecipeCreateSerializer):
+    """A recipe line of a bulk import.
+
+    Ingredients, tags and the author are referenced by name, slug and
+    username and resolved through the import catalog in the context.
+    """
+    ingredients = ImportIngredientSerializer(many=True, allow_empty=False)
+    tags = serializers.ListField(child=serializers.SlugField(), required=False)
+    image = serializers.CharField()
+    author = serializers.CharField(required=False)
+
+    class Meta(RecipeCreateSerializer.Meta):
+        fields = (
+            'ingredients', 'tags', 'image', 'name', 'text', 'cooking_time',
+            'author'
+            )
+
+    def validate_ingredients(self, value):
+        catalog = self.context['catalog']
+        amounts = {}
+        for item in value:
+            pk = catalog.ingredient_id(
+                item['name'], item.get('measurement_unit')
+            )
+            if pk is None:
+                raise serializers.ValidationError(
+                    f"Неизвестный ингредиент: {item['name']}"
+                )
+            amounts[pk] = int(item['amount'])
+        return amounts
+
+    def validate_tags(self, value):
+        catalog = self.context['catalog']
+        unknown = [slug for slug in value if catalog.tag_id(slug) is None]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Неизвестные тэги: {', '.join(unknown)}"
+            )
+        return [catalog.tag_id(slug) for slug in value]
+
+    def validate_author(self, value):
+        pk = self.context['catalog'].author_id(value)
+        if pk is None:
+            raise serializers.ValidationError(
+                f'Неизвестный пользователь: {value}'
+            )
+        return pk
+
+    def validate_image(self, value):
+        if value.startswith('data:'):
+            return Base64ImageField().to_internal_value(value)
+        if not default_storage.exists(value):
+            raise serializers.ValidationError(f'Файл не найден: {value}')
+        return value
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageUpload
+        fields = ('id', 'size', 'received', 'is_complete')
+
 
 class ShoppingListSerializer(serializers.ModelSerializer):
     recipe = RecipeSerializer(read_only=True)
@@ -216,10 +415,11 @@ class SubscriptionRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class UserSubscriptionSerializer(serializers.ModelSerializer):
+class UserSubscriptionSerializer(SparseFieldsMixin,
+                                 serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_limit = 3
 
     class Meta:
         model = User
@@ -229,18 +429,18 @@ class UserSubscriptionSerializer(serializers.ModelSerializer):
                   'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return user.is_subscribed_to(obj)
-        return False
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author__id=obj.id).count()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return get_relations(self.context).is_subscribed_to(obj.pk)
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(
-            author__id=obj.id
-        ).order_by('-pub_date')[:3]
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(
+                author__id=obj.id
+            ).order_by('-pub_date')[
+                :self.context.get('recipes_limit', self.recipes_limit)
+            ]
         serializer = SubscriptionRecipeSerializer(
             recipes, many=True, read_only=True
         )
@@ -0,0 +1,105 @@
+import csv
+import json
+from collections import namedtuple
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.db.models import F
+from recepies.models import ShoppingListIngredient
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen.canvas import Canvas
+except ImportError:
+    Canvas = None
+
+CHUNK_SIZE = 2000
+PDF_CHUNK_SIZE = 64 * 1024
+
+Exporter = namedtuple('Exporter', ('content_type', 'render'))
+
+
+def cart_rows(user):
+    """Ingredient totals of the user's cart sorted by name.
+
+    Totals are kept up to date by recepies.cart, so this is a read of
+    the user's rows only, through a server-side cursor where the
+    backend supports one.
+    """
+    return ShoppingListIngredient.objects.filter(user=user).values(
+        'amount',
+        name=F('ingredient__name'),
+        units=F('ingredient__units'),
+    ).order_by('name', 'units').iterator(chunk_size=CHUNK_SIZE)
+
+
+def render_txt(rows):
+    for row in rows:
+        yield f"{row['name']} ({row['units']}) — {row['amount']}\n"
+
+
+class Echo:
+    """File-like object handing back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        yield writer.writerow((row['name'], row['units'], row['amount']))
+
+
+def render_json(rows):
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps({
+            'name': row['name'],
+            'measurement_unit': row['units'],
+            'amount': row['amount'],
+        }, ensure_ascii=False)
+        separator = ',\n'
+    yield '[]' if separator == '[' else ']'
+
+
+def render_pdf(rows):
+    """PDF pages spooled to disk and streamed in chunks.
+
+    reportlab needs a TrueType font with Cyrillic glyphs, configured by
+    SHOPPING_CART_PDF_FONT.
+    """
+    pdfmetrics.registerFont(
+        TTFont('CartFont', settings.SHOPPING_CART_PDF_FONT)
+    )
+    width, height = A4
+    margin, line_height = 50, 18
+    with SpooledTemporaryFile(max_size=PDF_CHUNK_SIZE) as buffer:
+        canvas = Canvas(buffer, pagesize=A4)
+        canvas.setFont('CartFont', 12)
+        y = height - margin
+        for row in rows:
+            if y < margin:
+                canvas.showPage()
+                canvas.setFont('CartFont', 12)
+                y = height - margin
+            canvas.drawString(
+                margin, y,
+                f"{row['name']} ({row['units']}) — {row['amount']}"
+            )
+            y -= line_height
+        canvas.save()
+        buffer.seek(0)
+        yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
+
+
+EXPORTERS = {
+    'txt': Exporter('text/plain; charset=utf-8', render_txt),
+    'csv': Exporter('text/csv; charset=utf-8', render_csv),
+    'json': Exporter('application/json', render_json),
+}
+if Canvas is not None:
+    EXPORTERS['pdf'] = Exporter('application/pdf', render_pdf)
@@ -0,0 +1,95 @@
+from api.authentication import token_users
+from api.cache import invalidate
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recepies.models import (Ingredient, Recipe, RecipeIngredient,
+                             ShoppingList, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate('recipes', f'recipe:{instance.pk}')
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    invalidate(f'recipe:{instance.recipe_id}')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        invalidate('recipes', f'tag:{instance.pk}')
+    else:
+        invalidate('recipes', f'recipe:{instance.pk}')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    invalidate('tags', f'tag:{instance.pk}')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient(sender, instance, **kwargs):
+    invalidate('ingredients', f'ingredient:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate(f'user:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=User.favorite_recipes.through)
+def invalidate_favorites(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate('favorites')
+
+
+@receiver(m2m_changed, sender=User.favorite_recipes.through)
+@receiver(m2m_changed, sender=User.subscriptions.through)
+def invalidate_user_relations(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate(f'relations:{instance.pk}')
+    elif pk_set:
+        invalidate(*(f'relations:{pk}' for pk in pk_set))
+
+
+@receiver(m2m_changed, sender=ShoppingList.recipes.through)
+def invalidate_cart_relations(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate(f'relations:{instance.user_id}')
+    elif pk_set:
+        users = ShoppingList.objects.filter(
+            pk__in=pk_set
+        ).values_list('user_id', flat=True)
+        invalidate(*(f'relations:{pk}' for pk in users))
+
+
+@receiver(post_delete, sender=Token)
+def evict_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: token_users.evict(key))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_user_tokens(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: token_users.evict_user(pk))
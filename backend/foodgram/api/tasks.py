@@ -0,0 +1,21 @@
+import tempfile
+
+from api.bulk import export_recipes
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from jobs.queue import task
+
+
+@task('api.export_recipes')
+def export_recipes_to_storage():
+    """Write the NDJSON export into the media storage."""
+    with tempfile.TemporaryFile() as file:
+        for line in export_recipes():
+            file.write(line.encode('utf-8'))
+        file.seek(0)
+        path = default_storage.save(
+            f'exports/recipes-{timezone.now():%Y%m%d-%H%M%S}.ndjson',
+            File(file)
+        )
+    return {'path': path}
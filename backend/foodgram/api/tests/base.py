@@ -0,0 +1,84 @@
+import tempfile
+
+from api import throttling
+from api.authentication import token_users
+from django.core.cache import caches
+from django.test import override_settings
+from recepies.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    },
+    THROTTLE_STORE='local',
+    TOKEN_AUTH_SHARED_CACHE=None,
+)
+class FoodgramTestCase(APITestCase):
+    """Test case with the process-wide caches emptied before each test."""
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        token_users.clear()
+        throttling._bucket_stores.clear()
+        throttling._slots.clear()
+
+    def use_temporary_media(self):
+        """Point the media storage at a directory removed after the test."""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    @staticmethod
+    def create_user(username, password='secret-password-1'):
+        user = User.objects.create(
+            username=username, email=f'{username}@example.com',
+            first_name=username, last_name=username
+        )
+        user.set_password(password)
+        user.save()
+        return user
+
+    def authenticate(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return token
+
+    @staticmethod
+    def create_recipe(author, name='recipe', tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='text', cooking_time=10,
+            image='recipes/images/recipe.png'
+        )
+        recipe.tags.set(tags)
+        for ingredient, amount in ingredients:
+            recipe.recipeingredient_set.create(
+                ingredients=ingredient, amount=amount
+            )
+        return recipe
+
+    @staticmethod
+    def create_catalog(tags=2, ingredients=3):
+        return (
+            [
+                Tag.objects.create(
+                    name=f'tag {index}', slug=f'tag-{index}',
+                    hexcolor='#ffffff'
+                )
+                for index in range(tags)
+            ],
+            [
+                Ingredient.objects.create(
+                    name=f'ingredient {index}', units='g'
+                )
+                for index in range(ingredients)
+            ],
+        )
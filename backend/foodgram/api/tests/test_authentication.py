@@ -0,0 +1,30 @@
+from api.tests.base import FoodgramTestCase
+from users.models import User
+
+
+class CachedTokenAuthenticationTest(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('author', password='old-password-1')
+        self.authenticate(self.user)
+
+    def test_set_password_keeps_counters_of_cached_user(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        for index in range(3):
+            self.create_recipe(self.user, name=f'recipe {index}')
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'old-password-1',
+            'new_password': 'new-password-1',
+        })
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.recipes_count, 3)
+        self.assertTrue(user.check_password('new-password-1'))
+
+    def test_deactivated_user_is_rejected_after_cache_hit(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
@@ -0,0 +1,84 @@
+import json
+
+from api.tests.base import FoodgramTestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from recepies.models import Recipe
+
+
+class RecipeImportExportTest(FoodgramTestCase):
+    """The NDJSON export imports back into the same recipes."""
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media()
+        default_storage.save(
+            'recipes/images/recipe.png', ContentFile(b'image')
+        )
+        self.admin = self.create_user('admin')
+        self.admin.is_staff = True
+        self.admin.save()
+        self.authenticate(self.admin)
+
+    def export(self):
+        response = self.client.get('/api/recipes/export/')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_round_trip(self):
+        tags, ingredients = self.create_catalog()
+        author = self.create_user('author')
+        self.create_recipe(
+            author, name='first', tags=tags,
+            ingredients=[(ingredients[0], 100), (ingredients[1], 5)]
+        )
+        self.create_recipe(
+            self.admin, name='second', tags=tags[:1],
+            ingredients=[(ingredients[2], 1)]
+        )
+        exported = self.export()
+        lines = [json.loads(line) for line in exported.splitlines()]
+        self.assertEqual([line['name'] for line in lines], ['first', 'second'])
+        self.assertEqual(lines[0]['author'], 'author')
+        self.assertEqual(lines[0]['ingredients'][0], {
+            'name': 'ingredient 0', 'measurement_unit': 'g', 'amount': 100
+        })
+
+        Recipe.objects.all().delete()
+        response = self.client.post(
+            '/api/recipes/import/', exported.encode('utf-8'),
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'created': 2, 'errors': []})
+        self.assertEqual(self.export(), exported)
+        author.refresh_from_db()
+        self.assertEqual(author.recipes_count, 1)
+
+    def test_invalid_lines_are_reported(self):
+        self.create_catalog()
+        body = '\n'.join([
+            '{"name": "broken"',
+            json.dumps({
+                'name': 'no ingredients', 'text': 'text', 'cooking_time': 1,
+                'image': 'recipes/images/recipe.png', 'tags': ['tag-0'],
+                'ingredients': [],
+            }),
+            json.dumps({
+                'name': 'valid', 'text': 'text', 'cooking_time': 1,
+                'image': 'recipes/images/recipe.png', 'tags': ['tag-0'],
+                'ingredients': [{'name': 'ingredient 1', 'amount': 2}],
+            }),
+        ])
+        response = self.client.post(
+            '/api/recipes/import/', body.encode('utf-8'),
+            content_type='application/x-ndjson'
+        )
+        report = response.json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(
+            [error['line'] for error in report['errors']], [1, 2]
+        )
+        self.assertEqual(
+            list(Recipe.objects.values_list('name', flat=True)), ['valid']
+        )
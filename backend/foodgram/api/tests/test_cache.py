@@ -0,0 +1,110 @@
+from api.cache import get_recipe_payloads
+from api.serializers import RecipeSerializer
+from api.tests.base import FoodgramTestCase
+
+
+class CachedRecipesTest(FoodgramTestCase):
+    """Cached anonymous responses and shared payloads follow the writes."""
+
+    def setUp(self):
+        super().setUp()
+        self.tags, self.ingredients = self.create_catalog()
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(
+            self.author, tags=self.tags[:1],
+            ingredients=[(self.ingredients[0], 10)]
+        )
+        self.detail_url = f'/api/recipes/{self.recipe.pk}/'
+
+    def get(self, url, user=None):
+        self.client.credentials()
+        if user is not None:
+            self.authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def get_anonymous(self):
+        """Anonymous list and detail, which must not come from the cache."""
+        listed = self.get('/api/recipes/')
+        detail = self.get(self.detail_url)
+        self.assertEqual(listed['X-Cache'], 'MISS')
+        self.assertEqual(detail['X-Cache'], 'MISS')
+        return listed.json()['results'][0], detail.json()
+
+    def edit(self, data):
+        self.authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.detail_url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_responses_are_cached(self):
+        self.get_anonymous()
+        self.assertEqual(self.get('/api/recipes/')['X-Cache'], 'HIT')
+        self.assertEqual(self.get(self.detail_url)['X-Cache'], 'HIT')
+
+    def test_recipe_edit(self):
+        self.get_anonymous()
+        self.edit({'name': 'renamed'})
+        listed, detail = self.get_anonymous()
+        self.assertEqual(listed['name'], 'renamed')
+        self.assertEqual(detail['name'], 'renamed')
+
+    def test_tags_change(self):
+        self.get_anonymous()
+        self.edit({'tags': [self.tags[1].pk]})
+        listed, detail = self.get_anonymous()
+        self.assertEqual([tag['id'] for tag in listed['tags']], [
+            self.tags[1].pk
+        ])
+        self.assertEqual([tag['id'] for tag in detail['tags']], [
+            self.tags[1].pk
+        ])
+
+    def test_ingredients_change(self):
+        self.get_anonymous()
+        self.edit({
+            'ingredients': [{'id': self.ingredients[1].pk, 'amount': 3}]
+        })
+        _, detail = self.get_anonymous()
+        self.assertEqual(
+            [(item['id'], item['amount']) for item in detail['ingredients']],
+            [(self.ingredients[1].pk, 3)]
+        )
+
+    def test_author_edit(self):
+        self.get_anonymous()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Renamed'
+            self.author.save()
+        listed, detail = self.get_anonymous()
+        self.assertEqual(listed['author']['first_name'], 'Renamed')
+        self.assertEqual(detail['author']['first_name'], 'Renamed')
+
+    def test_shared_payloads_carry_no_user_flags(self):
+        reader = self.create_user('reader')
+        other = self.create_user('other')
+        self.authenticate(reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{self.detail_url}favorite/')
+            self.client.post(f'{self.detail_url}shopping_cart/')
+            self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        flags = ('is_favorited', 'is_in_shopping_cart')
+        for url in (self.detail_url, '/api/recipes/'):
+            data = self.get(url, reader).json()
+            recipe = data['results'][0] if 'results' in data else data
+            for flag in flags:
+                self.assertTrue(recipe[flag])
+            self.assertTrue(recipe['author']['is_subscribed'])
+            for user in (other, None):
+                data = self.get(url, user).json()
+                recipe = data['results'][0] if 'results' in data else data
+                for flag in flags:
+                    self.assertFalse(recipe[flag])
+                self.assertFalse(recipe['author']['is_subscribed'])
+        shared = get_recipe_payloads(
+            [self.recipe.pk], tuple(RecipeSerializer.Meta.fields)
+        )[self.recipe.pk]
+        for flag in flags:
+            self.assertFalse(shared[flag])
+        self.assertFalse(shared['author']['is_subscribed'])
@@ -0,0 +1,65 @@
+from api.tests.base import FoodgramTestCase
+
+
+class ConditionalGetTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.recipe = self.create_recipe(self.author)
+        self.detail_url = f'/api/recipes/{self.recipe.pk}/'
+
+    def get(self, url, user=None, **headers):
+        self.client.credentials()
+        if user is not None:
+            self.authenticate(user)
+        return self.client.get(url, **headers)
+
+    def test_matching_etag_answers_304(self):
+        for user in (None, self.reader):
+            for url in ('/api/recipes/', self.detail_url):
+                etag = self.get(url, user)['ETag']
+                response = self.get(url, user, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertFalse(response.content)
+                modified = self.get(
+                    url, user, HTTP_IF_NONE_MATCH='"stale"'
+                )
+                self.assertEqual(modified.status_code, 200)
+
+    def test_recipe_edit_changes_the_etag(self):
+        etags = {
+            url: self.get(url, self.reader)['ETag']
+            for url in ('/api/recipes/', self.detail_url)
+        }
+        self.authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                self.detail_url, {'name': 'renamed'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        for url, etag in etags.items():
+            response = self.get(url, self.reader, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_favorite_toggle_changes_the_etag_of_its_user(self):
+        etag = self.get(self.detail_url, self.reader)['ETag']
+        other_etag = self.get(self.detail_url, self.author)['ETag']
+        self.assertNotEqual(etag, other_etag)
+        seen = {etag}
+        for method in ('post', 'delete'):
+            self.authenticate(self.reader)
+            with self.captureOnCommitCallbacks(execute=True):
+                getattr(self.client, method)(f'{self.detail_url}favorite/')
+            response = self.get(
+                self.detail_url, self.reader, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn(response['ETag'], seen)
+            seen.add(response['ETag'])
+            etag = response['ETag']
+        self.assertEqual(
+            self.get(self.detail_url, self.author)['ETag'], other_etag
+        )
@@ -0,0 +1,53 @@
+from api.tests.base import FoodgramTestCase
+from recepies.models import Recipe
+from users.models import User
+
+
+class CounterFieldsTest(FoodgramTestCase):
+    """Saves of stale instances keep the F() maintained counters."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+
+    def test_stale_user_save_keeps_recipes_count(self):
+        stale = User.objects.get(pk=self.author.pk)
+        for index in range(3):
+            self.create_recipe(self.author, name=f'recipe {index}')
+        stale.first_name = 'renamed'
+        stale.save()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 3)
+        self.assertEqual(self.author.first_name, 'renamed')
+
+    def test_stale_recipe_save_keeps_favorites_count(self):
+        recipe = self.create_recipe(self.author)
+        stale = Recipe.objects.get(pk=recipe.pk)
+        self.authenticate(self.reader)
+        response = self.client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        stale.name = 'renamed'
+        stale.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.name, 'renamed')
+
+    def test_recipe_update_keeps_favorites_count(self):
+        tags, ingredients = self.create_catalog()
+        recipe = self.create_recipe(
+            self.author, tags=tags, ingredients=[(ingredients[0], 5)]
+        )
+        self.authenticate(self.reader)
+        self.client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        self.authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{recipe.pk}/', {
+                'name': 'renamed', 'text': 'text', 'cooking_time': 5,
+                'tags': [tag.pk for tag in tags],
+                'ingredients': [{'id': ingredients[1].pk, 'amount': 2}],
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
@@ -0,0 +1,152 @@
+import os
+import tempfile
+from itertools import count
+
+from django.db import OperationalError
+from django.test import SimpleTestCase
+from foodgram.db import pool
+from foodgram.db.pool import ConnectionMetrics, ConnectionPool, PoolTimeout
+from foodgram.db.sqlite3.base import DatabaseWrapper
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.broken = False
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def ping(connection):
+    if connection.broken:
+        raise OSError('server closed the connection')
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        numbers = count()
+        self.connect = lambda: FakeConnection(next(numbers))
+        self.metrics = ConnectionMetrics()
+        self.pool = ConnectionPool(self.metrics, size=2, timeout=0.05)
+
+    def test_returned_connection_is_reused(self):
+        connection, created = self.pool.checkout(self.connect, ping)
+        self.pool.checkin(connection, created)
+        self.assertEqual(
+            self.pool.checkout(self.connect, ping), (connection, created)
+        )
+        self.assertEqual(self.metrics.counters['connects'], 1)
+        self.assertEqual(self.pool.stats['in_use'], 1)
+
+    def test_dropped_connection_is_replaced_on_checkout(self):
+        connection, created = self.pool.checkout(self.connect, ping)
+        self.pool.checkin(connection, created)
+        connection.broken = True
+        replaced, _ = self.pool.checkout(self.connect, ping)
+        self.assertIsNot(replaced, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.metrics.counters['reconnects'], 1)
+        self.assertEqual(self.pool.stats['open'], 1)
+
+    def test_discarded_connection_frees_its_place(self):
+        first, _ = self.pool.checkout(self.connect)
+        self.pool.checkout(self.connect)
+        with self.assertRaises(PoolTimeout):
+            self.pool.checkout(self.connect)
+        self.assertEqual(self.metrics.counters['timeouts'], 1)
+        self.pool.discard(first)
+        self.assertTrue(first.closed)
+        third, _ = self.pool.checkout(self.connect)
+        self.assertEqual(third.number, 2)
+        self.assertEqual(self.pool.stats['open'], 2)
+
+    def test_old_connection_is_closed_on_checkin(self):
+        self.pool.recycle = 60
+        connection, created = self.pool.checkout(self.connect)
+        self.pool.checkin(connection, created - 61)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats, {
+            'size': 2, 'open': 0, 'idle': 0, 'in_use': 0
+        })
+
+    def test_failed_connect_frees_its_place(self):
+        def refuse():
+            raise OSError('connection refused')
+
+        for _ in range(3):
+            with self.assertRaises(OSError):
+                self.pool.checkout(refuse)
+        self.assertEqual(self.pool.stats['open'], 0)
+
+
+class ManagedConnectionTest(SimpleTestCase):
+    """The pooled backend hands the raw connection from wrapper to wrapper."""
+
+    alias = 'pool_test'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {
+            'NAME': os.path.join(directory.name, 'pool.sqlite3'),
+            'OPTIONS': {},
+            'TIME_ZONE': None,
+            'AUTOCOMMIT': True,
+            'ATOMIC_REQUESTS': False,
+            'CONN_MAX_AGE': 60,
+            'HEALTH_CHECKS': True,
+            'POOL': {'SIZE': 1, 'TIMEOUT': 0.05},
+        }
+        self.addCleanup(self.forget_pool)
+
+    def forget_pool(self):
+        pool._pools.pop(self.alias).clear()
+        pool._metrics.pop(self.alias)
+
+    def wrapper(self):
+        wrapper = DatabaseWrapper(self.settings_dict, self.alias)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def test_closed_wrapper_returns_its_connection(self):
+        first = self.wrapper()
+        connection = first.connection
+        first.close()
+        second = self.wrapper()
+        self.assertIs(second.connection, connection)
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        second.close()
+        self.assertEqual(pool.get_stats()[self.alias]['connects'], 1)
+
+    def test_broken_connection_is_not_handed_out(self):
+        first = self.wrapper()
+        connection = first.connection
+        first.close()
+        connection.close()
+        second = self.wrapper()
+        self.assertIsNot(second.connection, connection)
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        second.close()
+        stats = pool.get_stats()[self.alias]
+        self.assertEqual(stats['reconnects'], 1)
+        self.assertEqual(stats['open'], 1)
+
+    def test_connection_broken_in_a_request_is_discarded(self):
+        first = self.wrapper()
+        connection = first.connection
+        connection.close()
+        first.close()
+        self.assertEqual(pool.get_stats()[self.alias]['open'], 0)
+        second = self.wrapper()
+        self.assertIsNot(second.connection, connection)
+        second.close()
+
+    def test_full_pool_raises_a_database_error(self):
+        first = self.wrapper()
+        with self.assertRaises(OperationalError):
+            self.wrapper()
+        first.close()
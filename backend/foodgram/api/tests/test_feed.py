@@ -0,0 +1,94 @@
+from api.tests.base import FoodgramTestCase
+from django.test import override_settings
+from recepies.models import FeedEntry
+
+
+@override_settings(FEED_FANOUT_MAX_SUBSCRIBERS=1, FEED_FANOUT_MAX_RECIPES=3)
+class FeedTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.old = [
+            self.create_recipe(self.author, name=f'old {index}')
+            for index in range(2)
+        ]
+
+    def subscribe(self, user, author, method='post'):
+        self.authenticate(user)
+        response = getattr(self.client, method)(
+            f'/api/users/{author.pk}/subscribe/'
+        )
+        self.assertLess(response.status_code, 300)
+
+    def feed(self, user, limit=None):
+        """Names in the user's feed, following every page."""
+        self.authenticate(user)
+        url = '/api/recipes/feed/' + (f'?limit={limit}' if limit else '')
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            names += [recipe['name'] for recipe in data['results']]
+            url = data['next']
+        return names
+
+    def entries(self, user):
+        return set(FeedEntry.objects.filter(user=user).values_list(
+            'recipe__name', flat=True
+        ))
+
+    def test_subscribe_backfills_and_publishing_fans_out(self):
+        self.subscribe(self.reader, self.author)
+        self.assertEqual(self.entries(self.reader), {'old 0', 'old 1'})
+        self.create_recipe(self.author, name='new')
+        self.assertEqual(
+            self.entries(self.reader), {'old 0', 'old 1', 'new'}
+        )
+        self.assertEqual(self.feed(self.reader), ['new', 'old 1', 'old 0'])
+
+    def test_unsubscribe_trims(self):
+        self.subscribe(self.reader, self.author)
+        self.subscribe(self.reader, self.author, 'delete')
+        self.assertEqual(self.entries(self.reader), set())
+        self.assertEqual(self.feed(self.reader), [])
+
+    def test_author_with_many_subscribers_is_pulled(self):
+        other = self.create_user('other')
+        self.subscribe(self.reader, self.author)
+        self.subscribe(other, self.author)
+        self.assertEqual(self.entries(other), set())
+        self.create_recipe(self.author, name='new')
+        self.assertNotIn('new', self.entries(self.reader))
+        for user in (self.reader, other):
+            self.assertEqual(self.feed(user), ['new', 'old 1', 'old 0'])
+        self.subscribe(other, self.author, 'delete')
+        self.assertEqual(self.feed(other), [])
+
+    def test_author_with_many_recipes_is_pulled(self):
+        prolific = self.create_user('prolific')
+        for index in range(4):
+            self.create_recipe(prolific, name=f'prolific {index}')
+        self.subscribe(self.reader, prolific)
+        self.assertEqual(self.entries(self.reader), set())
+        self.assertEqual(
+            self.feed(self.reader),
+            [f'prolific {index}' for index in reversed(range(4))]
+        )
+
+    def test_pages_merge_pushed_and_pulled_authors(self):
+        prolific = self.create_user('prolific')
+        self.subscribe(self.reader, self.author)
+        expected = ['old 0', 'old 1']
+        for index in range(4):
+            self.create_recipe(prolific, name=f'prolific {index}')
+            expected.append(f'prolific {index}')
+            if index == 1:
+                self.create_recipe(self.author, name='new')
+                expected.append('new')
+        self.subscribe(self.reader, prolific)
+        self.assertEqual(
+            self.entries(self.reader), {'old 0', 'old 1', 'new'}
+        )
+        self.assertEqual(self.feed(self.reader, limit=2), expected[::-1])
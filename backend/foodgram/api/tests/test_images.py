@@ -0,0 +1,50 @@
+from io import BytesIO
+
+from api.tests.base import FoodgramTestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from recepies import images
+
+SHARED = 'recipes/images/shared.png'
+
+
+class RecipeImageTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media()
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), 'red').save(buffer, 'PNG')
+        default_storage.save(SHARED, ContentFile(buffer.getvalue()))
+        self.author = self.create_user('author')
+
+    def create_recipe_with_image(self, name, image):
+        recipe = self.create_recipe(self.author, name=name)
+        recipe.image = image
+        recipe.save(update_fields=['image'])
+        return recipe
+
+    def test_process_stores_the_original_and_variants(self):
+        recipe = self.create_recipe_with_image('recipe', SHARED)
+        images.process(recipe.pk)
+        recipe.refresh_from_db()
+        variants = recipe.image_variants
+        self.assertEqual(recipe.image.name, variants['original'])
+        self.assertEqual(
+            set(variants), {'original', *images.VARIANTS}
+        )
+        for path in variants.values():
+            self.assertTrue(default_storage.exists(path))
+        self.assertFalse(default_storage.exists(SHARED))
+
+    def test_shared_source_is_kept_until_its_last_recipe(self):
+        first = self.create_recipe_with_image('first', SHARED)
+        second = self.create_recipe_with_image('second', SHARED)
+        images.process(first.pk)
+        self.assertTrue(default_storage.exists(SHARED))
+        images.process(second.pk)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(default_storage.exists(second.image.name))
+        self.assertFalse(default_storage.exists(SHARED))
@@ -0,0 +1,121 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from jobs import queue
+from jobs.models import Job
+from jobs.worker import Worker
+
+
+class EnqueueTest(TestCase):
+    def test_queued_job_is_not_added_twice(self):
+        first = queue.enqueue('task', dedup_key='key', value=1)
+        second = queue.enqueue('task', dedup_key='key', value=2)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+        Job.objects.filter(pk=first.pk).update(status=Job.RUNNING)
+        third = queue.enqueue('task', dedup_key='key')
+        self.assertNotEqual(third.pk, first.pk)
+        queue.enqueue('task')
+        queue.enqueue('task')
+        self.assertEqual(Job.objects.count(), 4)
+
+    @override_settings(JOBS_BACKOFF_BASE=10, JOBS_BACKOFF_MAX=60)
+    def test_backoff_doubles_up_to_the_maximum(self):
+        for attempts, delay in ((1, 10), (2, 20), (3, 40), (4, 60), (9, 60)):
+            seconds = queue.backoff(attempts).total_seconds()
+            self.assertGreaterEqual(seconds, delay / 2)
+            self.assertLessEqual(seconds, delay)
+
+
+@override_settings(JOBS_TIMEOUT=60)
+class WorkerTest(TransactionTestCase):
+    def setUp(self):
+        tasks = mock.patch.dict(queue.TASKS, {
+            'add': lambda a, b: a + b,
+            'broken': self.broken,
+        })
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    @staticmethod
+    def broken():
+        raise ValueError('broken task')
+
+    def run_worker(self):
+        Worker(threads=2, poll_interval=0.01).run(once=True)
+
+    def test_due_jobs_run_and_delayed_jobs_wait(self):
+        done = queue.enqueue('add', a=1, b=2)
+        later = queue.enqueue('add', delay=timedelta(hours=1), a=0, b=0)
+        self.run_worker()
+        done.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual(done.status, Job.DONE)
+        self.assertEqual(done.result, 3)
+        self.assertEqual(done.attempts, 1)
+        self.assertEqual(later.status, Job.QUEUED)
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        job = queue.enqueue('broken', max_attempts=2)
+        started = timezone.now()
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('broken task', job.last_error)
+        self.assertGreater(job.run_at, started)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_only_jobs_of_gone_workers_are_taken_back(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        gone = queue.enqueue('add', a=1, b=1)
+        alive = queue.enqueue('add', a=2, b=2)
+        Job.objects.update(
+            status=Job.RUNNING, started_at=long_ago, heartbeat_at=long_ago,
+            attempts=1
+        )
+        Job.objects.filter(pk=alive.pk).update(worker='alive')
+        queue.heartbeat('alive')
+        queue.fail_stale(timedelta(minutes=1))
+        gone.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual(gone.status, Job.QUEUED)
+        self.assertIn('gone', gone.last_error)
+        self.assertEqual(alive.status, Job.RUNNING)
+
+    @override_settings(JOBS_TIMEOUT=0.4)
+    def test_slow_job_is_not_run_twice(self):
+        release = threading.Event()
+        runs = []
+
+        def slow():
+            runs.append(1)
+            release.wait(5)
+
+        queue.TASKS['slow'] = slow
+        job = queue.enqueue('slow')
+        worker = Worker(threads=1, poll_interval=0.02)
+        thread = threading.Thread(target=worker.run, kwargs={'once': True})
+        thread.start()
+        try:
+            # Three timeouts in, other workers would have taken it back.
+            threading.Event().wait(1.2)
+            queue.fail_stale(timedelta(seconds=0.4))
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.RUNNING)
+        finally:
+            release.set()
+            thread.join(5)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(len(runs), 1)
@@ -0,0 +1,53 @@
+from base64 import b64encode
+
+from api.tests.base import FoodgramTestCase
+
+
+def encode(raw):
+    return b64encode(raw.encode(), altchars=b'-_').decode()
+
+
+class RecipeKeysetPaginationTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.recipes = [
+            self.create_recipe(self.author, name=f'recipe {index}')
+            for index in range(7)
+        ]
+
+    def names(self, data):
+        return [recipe['name'] for recipe in data['results']]
+
+    def test_pages_have_no_duplicates_or_gaps_after_inserts(self):
+        response = self.client.get('/api/recipes/', {'cursor': '', 'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn('count', data)
+        names = self.names(data)
+        for index in range(2):
+            self.create_recipe(self.author, name=f'newer {index}')
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            names += self.names(data)
+        self.assertEqual(
+            names, [f'recipe {index}' for index in reversed(range(7))]
+        )
+
+    def test_other_orderings_are_paged_by_number(self):
+        response = self.client.get(
+            '/api/recipes/', {'cursor': '', 'ordering': 'pub_date'}
+        )
+        data = response.json()
+        self.assertEqual(data['count'], 7)
+        self.assertEqual(self.names(data)[0], 'recipe 0')
+        response = self.client.get(
+            '/api/recipes/', {'cursor': '', 'ordering': '-pub_date'}
+        )
+        self.assertNotIn('count', response.json())
+
+    def test_bad_cursor_is_not_found(self):
+        for cursor in ('%%%', encode('no separator'), encode('later|1'),
+                       encode('2024-01-01T00:00:00|x')):
+            response = self.client.get('/api/recipes/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
@@ -0,0 +1,82 @@
+from api.authentication import token_users
+from api.tests.base import FoodgramTestCase
+from django.core.cache import caches
+
+
+class RecipeQueriesTest(FoodgramTestCase):
+    """Recipe list and detail load in a fixed number of queries.
+
+    The payload and token caches are emptied before each request, so
+    every recipe is serialized from the database.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tags, self.ingredients = self.create_catalog()
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.recipes = []
+        self.add_recipes(2)
+        self.authenticate(self.reader)
+        recipe = self.recipes[0]
+        self.client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        self.client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        self.client.credentials()
+
+    def add_recipes(self, count):
+        for _ in range(count):
+            self.recipes.append(self.create_recipe(
+                self.author, name=f'recipe {len(self.recipes)}',
+                tags=self.tags,
+                ingredients=[
+                    (ingredient, 10) for ingredient in self.ingredients
+                ]
+            ))
+
+    def get_cold(self, url, queries):
+        caches['default'].clear()
+        token_users.clear()
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_anonymous_list(self):
+        # count, page ids, payloads, tags
+        data = self.get_cold('/api/recipes/', 4)
+        self.assertEqual(len(data['results']), 2)
+        self.add_recipes(8)
+        data = self.get_cold('/api/recipes/', 4)
+        self.assertEqual(len(data['results']), 6)
+        self.assertFalse(data['results'][0]['is_favorited'])
+
+    def test_authenticated_list(self):
+        self.authenticate(self.reader)
+        # token, count, page ids, payloads, tags, favorites, cart, follows
+        self.get_cold('/api/recipes/', 8)
+        self.add_recipes(8)
+        data = self.get_cold('/api/recipes/?page=2', 8)
+        self.assertEqual(len(data['results']), 4)
+        first = data['results'][-1]
+        self.assertEqual(first['id'], self.recipes[0].pk)
+        self.assertTrue(first['is_favorited'])
+        self.assertTrue(first['is_in_shopping_cart'])
+        self.assertTrue(first['author']['is_subscribed'])
+        self.assertFalse(data['results'][0]['is_favorited'])
+
+    def test_anonymous_detail(self):
+        # recipe ids, payload, tags, ingredients
+        data = self.get_cold(f'/api/recipes/{self.recipes[0].pk}/', 4)
+        self.assertEqual(len(data['ingredients']), len(self.ingredients))
+        self.assertFalse(data['is_favorited'])
+
+    def test_authenticated_detail(self):
+        self.authenticate(self.reader)
+        # token, recipe ids, payload, tags, ingredients, favorites, cart,
+        # follows
+        data = self.get_cold(f'/api/recipes/{self.recipes[0].pk}/', 8)
+        self.assertEqual(len(data['ingredients']), len(self.ingredients))
+        self.assertTrue(data['is_favorited'])
+        self.assertTrue(data['is_in_shopping_cart'])
+        self.assertTrue(data['author']['is_subscribed'])
@@ -0,0 +1,84 @@
+from uuid import uuid4
+
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from foodgram.db.middleware import ReplicaRoutingMiddleware
+from foodgram.db.routers import primary
+from recepies.models import Tag
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    },
+    DATABASE_REPLICAS=['replica_0'],
+    DATABASE_STICKY_CACHE='default',
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Where the reads of a request go, outside of a test transaction."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def request(self, method='get', token=None, write=False, view=None):
+        """Aliases db_for_read gave in a request through the middleware."""
+        def get_response(request):
+            response = HttpResponse()
+            response.reads = [router.db_for_read(Tag)]
+            if write:
+                Tag.objects.create(
+                    name='tag', slug=uuid4().hex, hexcolor='#ffffff'
+                )
+                response.reads.append(router.db_for_read(Tag))
+            if view is not None:
+                response.reads.append(view())
+            return response
+
+        extra = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        request = getattr(self.factory, method)('/api/recipes/', **extra)
+        return ReplicaRoutingMiddleware(get_response)(request).reads
+
+    def test_safe_reads_go_to_the_replica(self):
+        self.assertEqual(self.request('get'), ['replica_0'])
+        self.assertEqual(self.request('head'), ['replica_0'])
+        self.assertEqual(self.request('post'), ['default'])
+        self.assertEqual(router.db_for_read(Tag), 'default')
+
+    def test_reads_after_a_write_go_to_default(self):
+        self.assertEqual(
+            self.request('get', write=True), ['replica_0', 'default']
+        )
+
+    def test_primary_and_transactions_read_from_default(self):
+        def read_in_primary():
+            with primary():
+                return router.db_for_read(Tag)
+
+        def read_in_transaction():
+            with transaction.atomic():
+                return router.db_for_read(Tag)
+
+        self.assertEqual(
+            self.request(view=read_in_primary), ['replica_0', 'default']
+        )
+        self.assertEqual(
+            self.request(view=read_in_transaction), ['replica_0', 'default']
+        )
+
+    def test_writing_client_sticks_to_default(self):
+        self.request('post', token='writer', write=True)
+        self.assertEqual(self.request(token='writer'), ['default'])
+        self.assertEqual(self.request(token='reader'), ['replica_0'])
+        self.assertEqual(self.request(), ['replica_0'])
+
+    def test_request_without_writes_does_not_stick(self):
+        self.request('post', token='writer')
+        self.assertEqual(self.request(token='writer'), ['replica_0'])
+
+    @override_settings(DATABASE_STICKY_SECONDS=0)
+    def test_stickiness_expires(self):
+        self.request('post', token='writer', write=True)
+        self.assertEqual(self.request(token='writer'), ['replica_0'])
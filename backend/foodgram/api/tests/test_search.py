@@ -0,0 +1,50 @@
+from unittest import mock
+
+from api.tests.base import FoodgramTestCase
+from django.db import connection
+from recepies.models import Recipe
+
+
+class RecipeSearchTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.best = self.create_recipe(self.author, name='borscht')
+        Recipe.objects.filter(pk=self.best.pk).update(
+            text='borscht with beets, the borscht of borschts'
+        )
+        self.create_recipe(self.author, name='pancakes')
+        self.worse = self.create_recipe(self.author, name='beet salad')
+        Recipe.objects.filter(pk=self.worse.pk).update(
+            text='a salad of beets to serve after a long borscht dinner'
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(
+            '/api/recipes/', {'search': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def names(self, data):
+        return [recipe['name'] for recipe in data['results']]
+
+    def test_full_text_results_are_ranked(self):
+        self.assertEqual(connection.vendor, 'sqlite')
+        self.assertEqual(
+            self.names(self.search('bors')), ['borscht', 'beet salad']
+        )
+
+    def test_cursor_is_ignored_for_ranked_results(self):
+        data = self.search('borscht', cursor='')
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(self.names(data), ['borscht', 'beet salad'])
+
+    def test_substring_fallback(self):
+        with mock.patch.object(connection, 'vendor', 'other'):
+            data = self.search('borscht')
+        self.assertEqual(
+            sorted(self.names(data)), ['beet salad', 'borscht']
+        )
+        with mock.patch.object(connection, 'vendor', 'other'):
+            self.assertEqual(self.names(self.search('pancake')), ['pancakes'])
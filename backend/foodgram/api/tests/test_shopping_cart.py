@@ -0,0 +1,28 @@
+from io import StringIO
+
+from api.tests.base import FoodgramTestCase
+from django.core.management import call_command
+from django.test import override_settings
+
+
+@override_settings(THROTTLE_CONCURRENCY={'cart_download': 1})
+class ShoppingCartDownloadTest(FoodgramTestCase):
+    def test_sequential_downloads_over_the_cap_succeed(self):
+        user = self.create_user('user')
+        self.authenticate(user)
+        for export_format in ('txt', 'csv', 'json'):
+            response = self.client.get(
+                '/api/recipes/download_shopping_cart/',
+                {'format': export_format}
+            )
+            self.assertEqual(response.status_code, 200)
+            b''.join(response.streaming_content)
+
+    def test_benchmark_downloads_every_format(self):
+        out = StringIO()
+        call_command(
+            'bench_shopping_cart', recipes=3, ingredients_per_recipe=2,
+            stdout=out
+        )
+        for export_format in ('legacy', 'txt', 'csv', 'json', 'pdf'):
+            self.assertIn(f'{export_format}:', out.getvalue())
@@ -0,0 +1,85 @@
+from io import StringIO
+
+from api.tests.base import FoodgramTestCase
+from django.core.management import CommandError, call_command
+from recepies.cart import expected_totals, stored_totals
+from recepies.models import ShoppingListIngredient
+
+
+class ShoppingTotalsTest(FoodgramTestCase):
+    """Stored cart totals equal the totals recomputed from the carts."""
+
+    def setUp(self):
+        super().setUp()
+        _, self.ingredients = self.create_catalog(tags=0)
+        salt, flour, milk = self.ingredients
+        self.author = self.create_user('author')
+        self.buyer = self.create_user('buyer')
+        self.bread = self.create_recipe(
+            self.author, name='bread', ingredients=[(salt, 5), (flour, 500)]
+        )
+        self.pancakes = self.create_recipe(
+            self.author, name='pancakes',
+            ingredients=[(flour, 200), (milk, 300)]
+        )
+
+    def assert_totals(self, expected):
+        totals = stored_totals([self.buyer.pk])
+        self.assertEqual(totals, expected_totals([self.buyer.pk]))
+        self.assertEqual(totals, {
+            (self.buyer.pk, ingredient.pk): amount
+            for ingredient, amount in expected.items()
+        })
+
+    def cart(self, method, recipe):
+        self.authenticate(self.buyer)
+        response = getattr(self.client, method)(
+            f'/api/recipes/{recipe.pk}/shopping_cart/'
+        )
+        self.assertLess(response.status_code, 300)
+
+    def test_totals_follow_carts_and_recipes(self):
+        salt, flour, milk = self.ingredients
+        self.cart('post', self.bread)
+        self.cart('post', self.pancakes)
+        self.assert_totals({salt: 5, flour: 700, milk: 300})
+
+        self.authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.pancakes.pk}/',
+            {'ingredients': [
+                {'id': flour.pk, 'amount': 250}, {'id': salt.pk, 'amount': 1}
+            ]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_totals({salt: 6, flour: 750})
+
+        self.cart('delete', self.bread)
+        self.assert_totals({salt: 1, flour: 250})
+
+        self.authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.pancakes.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_totals({})
+
+    def test_check_command_fails_on_drift(self):
+        self.cart('post', self.bread)
+        out = StringIO()
+        call_command('check_shopping_totals', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+        ShoppingListIngredient.objects.filter(user=self.buyer).update(
+            amount=1
+        )
+        with self.assertRaisesMessage(CommandError, str(self.buyer.pk)):
+            call_command('check_shopping_totals', stdout=out)
+        self.assertNotEqual(
+            stored_totals([self.buyer.pk]), expected_totals([self.buyer.pk])
+        )
+        with self.assertRaisesMessage(CommandError, 'rebuilt totals'):
+            call_command('check_shopping_totals', '--fix', stdout=out)
+        self.assertEqual(
+            stored_totals([self.buyer.pk]), expected_totals([self.buyer.pk])
+        )
+        call_command('check_shopping_totals', stdout=out)
@@ -0,0 +1,91 @@
+from api.tests.base import FoodgramTestCase
+from api.throttling import get_slots
+from api.views import ShoppingCartDownloadView, UserReceiveTokenViewSet
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+LOGIN_URL = '/api/auth/token/login/'
+
+
+@override_settings(
+    THROTTLE_RATES={
+        'login': {'ip': '3/m'},
+        'set_password': {'user': '2/m'},
+    },
+    THROTTLE_CONCURRENCY={'login': 2, 'cart_download': 1},
+    THROTTLE_RETRY_AFTER=1,
+)
+class AdmissionControlTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+
+    def login(self, password='wrong-password', **extra):
+        return self.client.post(
+            LOGIN_URL, {'email': self.user.email, 'password': password},
+            **extra
+        )
+
+    def test_empty_ip_bucket_answers_429(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 400)
+        response = self.login('secret-password-1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        other = self.login('secret-password-1', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.status_code, 200)
+
+    def test_user_bucket_follows_the_user_across_ips(self):
+        self.authenticate(self.user)
+        data = {'current_password': 'wrong', 'new_password': 'new-pass-12'}
+        for address in ('10.0.0.1', '10.0.0.2'):
+            response = self.client.post(
+                '/api/users/set_password/', data, REMOTE_ADDR=address
+            )
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            '/api/users/set_password/', data, REMOTE_ADDR='10.0.0.3'
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_requests_over_the_concurrency_cap_are_shed(self):
+        slots = get_slots('login')
+        releases = [slots.acquire(), slots.acquire()]
+        self.assertNotIn(None, releases)
+        response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        releases.pop()()
+        self.assertEqual(self.login().status_code, 400)
+        # The request has given its slot back.
+        release = slots.acquire()
+        self.assertIsNotNone(release)
+        release()
+        releases.pop()()
+
+    def test_unclosed_response_frees_its_slot(self):
+        view = UserReceiveTokenViewSet.as_view()
+        for _ in range(3):
+            request = APIRequestFactory().post(
+                LOGIN_URL, {'email': self.user.email, 'password': 'wrong'}
+            )
+            self.assertEqual(view(request).status_code, 400)
+
+    def test_streamed_response_holds_its_slot_until_closed(self):
+        view = ShoppingCartDownloadView.as_view()
+
+        def download():
+            request = APIRequestFactory().get(
+                '/api/recipes/download_shopping_cart/'
+            )
+            force_authenticate(request, user=self.user)
+            return view(request)
+
+        streamed = download()
+        self.assertEqual(streamed.status_code, 200)
+        self.assertEqual(download().status_code, 503)
+        b''.join(streamed.streaming_content)
+        streamed.close()
+        response = download()
+        self.assertEqual(response.status_code, 200)
+        response.close()
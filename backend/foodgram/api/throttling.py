@@ -0,0 +1,257 @@
+"""Admission control for the endpoints that are expensive to serve.
+
+A view with an `admission_scope` gets two guards, configured per scope
+in settings:
+
+* token buckets per client IP and per user (THROTTLE_RATES), refilled
+  continuously; an empty bucket answers 429 with Retry-After;
+* a cap on the requests of the scope served at once
+  (THROTTLE_CONCURRENCY); a request over the cap is shed with 503
+  instead of waiting in the gunicorn backlog.
+
+With THROTTLE_STORE = 'file' buckets live in fcntl-locked shard files and
+concurrency slots are fcntl locks in THROTTLE_DIR, so the limits hold for
+all workers of a host and a slot is freed even if its worker dies. With
+'local' they are per process.
+"""
+import json
+import os
+import random
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+SHARDS = 64
+MAX_LOCAL_BUCKETS = 10000
+
+
+def parse_rate(rate):
+    """Capacity and refill per second of a 'number/period' rate."""
+    number, period = rate.split('/')
+    return int(number), int(number) / PERIODS[period[0]]
+
+
+def take_token(bucket, capacity, per_second, now):
+    """New bucket state and the seconds to wait, 0 if a token was taken.
+
+    A state is (tokens, updated, full_at); once full_at has passed the
+    bucket is full again and the state can be forgotten.
+    """
+    tokens = capacity
+    if bucket is not None:
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * per_second)
+    wait = 0
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        wait = (1 - tokens) / per_second
+    return (tokens, now, now + (capacity - tokens) / per_second), wait
+
+
+def forget_full(buckets, now):
+    return {key: bucket for key, bucket in buckets.items() if bucket[2] > now}
+
+
+class LocalBucketStore:
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, per_second):
+        now = time.time()
+        with self.lock:
+            self.buckets[key], wait = take_token(
+                self.buckets.get(key), capacity, per_second, now
+            )
+            if len(self.buckets) > MAX_LOCAL_BUCKETS:
+                self.buckets = forget_full(self.buckets, now)
+        return wait
+
+
+class FileBucketStore:
+    """Buckets in JSON shard files, each changed under an fcntl lock."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def take(self, key, capacity, per_second):
+        import fcntl
+
+        os.makedirs(self.directory, exist_ok=True)
+        shard = zlib.crc32(key.encode()) % SHARDS
+        path = os.path.join(self.directory, f'buckets-{shard}.json')
+        now = time.time()
+        with open(path, 'a+') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                buckets = json.loads(file.read() or '{}')
+                buckets[key], wait = take_token(
+                    buckets.get(key), capacity, per_second, now
+                )
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps(forget_full(buckets, now)))
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+        return wait
+
+
+class LocalSlots:
+    def __init__(self, limit):
+        self.semaphore = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        if self.semaphore.acquire(blocking=False):
+            return self.semaphore.release
+        return None
+
+
+class FileSlots:
+    """`limit` lock files; holding the lock on one of them is a slot."""
+
+    def __init__(self, directory, scope, limit):
+        self.paths = [
+            os.path.join(directory, f'{scope}-{index}.lock')
+            for index in range(limit)
+        ]
+        os.makedirs(directory, exist_ok=True)
+
+    def acquire(self):
+        import fcntl
+
+        for path in random.sample(self.paths, len(self.paths)):
+            file = open(path, 'a')
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                file.close()
+                continue
+            return file.close
+        return None
+
+
+_bucket_stores = {}
+_slots = {}
+_lock = threading.Lock()
+
+
+def get_bucket_store():
+    kind = settings.THROTTLE_STORE
+    with _lock:
+        if kind not in _bucket_stores:
+            _bucket_stores[kind] = (
+                FileBucketStore(settings.THROTTLE_DIR)
+                if kind == 'file' else LocalBucketStore()
+            )
+    return _bucket_stores[kind]
+
+
+def get_slots(scope):
+    with _lock:
+        if scope not in _slots:
+            limit = settings.THROTTLE_CONCURRENCY[scope]
+            _slots[scope] = (
+                FileSlots(settings.THROTTLE_DIR, scope, limit)
+                if settings.THROTTLE_STORE == 'file' else LocalSlots(limit)
+            )
+    return _slots[scope]
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token buckets of a scope for the client IP and the user."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.wait_time = None
+
+    def get_idents(self, request):
+        yield 'ip', self.get_ident(request)
+        if request.user and request.user.is_authenticated:
+            yield 'user', request.user.pk
+
+    def allow_request(self, request, view):
+        rates = settings.THROTTLE_RATES.get(self.scope, {})
+        for kind, ident in self.get_idents(request):
+            if not rates.get(kind):
+                continue
+            capacity, per_second = parse_rate(rates[kind])
+            wait = get_bucket_store().take(
+                f'{self.scope}:{kind}:{ident}', capacity, per_second
+            )
+            if wait:
+                self.wait_time = wait
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class AdmissionControlMixin:
+    """Throttle and cap the requests of the view's admission scope."""
+    admission_scope = None
+
+    def get_admission_scope(self):
+        return self.admission_scope
+
+    def get_throttles(self):
+        throttles = super().get_throttles()
+        scope = self.get_admission_scope()
+        if scope in settings.THROTTLE_RATES:
+            throttles.append(TokenBucketThrottle(scope))
+        return throttles
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = self.get_admission_scope()
+        if scope in settings.THROTTLE_CONCURRENCY:
+            self.release_slot = get_slots(scope).acquire()
+            if self.release_slot is None:
+                raise Overloaded(settings.THROTTLE_RETRY_AFTER)
+
+    def pop_release_slot(self):
+        try:
+            return getattr(self, 'release_slot', None)
+        finally:
+            self.release_slot = None
+
+    def handle_exception(self, exc):
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            release = self.pop_release_slot()
+            if release is not None:
+                release()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        release = self.pop_release_slot()
+        if release is None:
+            return response
+        if response.streaming:
+            # Freed when the response is closed, after the streamed body.
+            response._resource_closers.append(release)
+        else:
+            # The work is done; callers need not close the response.
+            release()
+        return response
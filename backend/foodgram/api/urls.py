@@ -1,6 +1,8 @@
-from api.views import (IngredientViewSet, RecipeViewSet, SetPasswordView,
-                       ShoppingCartDownloadView, ShoppingListViewSet,
-                       TagViewSet, UserDeleteTokenViewSet,
+from api.views import (DatabaseStatsView, ImageUploadDetailView,
+                       ImageUploadView, IngredientViewSet, RecipeExportJobView,
+                       RecipeExportView, RecipeImportView, RecipeViewSet,
+                       SetPasswordView, ShoppingCartDownloadView,
+                       ShoppingListViewSet, TagViewSet, UserDeleteTokenViewSet,
                        UserReceiveTokenViewSet, UserSubscriptionsView,
                        UserViewSet)
 from django.urls import include, path
@@ -29,8 +31,28 @@ auth_urls = [path('login/', UserReceiveTokenViewSet.as_view(), name='login'),
 urlpatterns = [path('users/', include(user_urls)),
                path('auth/token/', include(auth_urls)),
                path(
+    'stats/databases/', DatabaseStatsView.as_view(), name='database_stats'
+    ),
+               path(
     'recipes/download_shopping_cart/',
     ShoppingCartDownloadView.as_view(), name='download_shopping_cart'
+    ),
+               path(
+    'recipes/import/', RecipeImportView.as_view(), name='recipe_import'
+    ),
+               path(
+    'recipes/export/', RecipeExportView.as_view(), name='recipe_export'
+    ),
+               path(
+    'recipes/export/<int:pk>/',
+    RecipeExportJobView.as_view(), name='recipe_export_job'
+    ),
+               path(
+    'recipes/uploads/', ImageUploadView.as_view(), name='image_upload'
+    ),
+               path(
+    'recipes/uploads/<uuid:pk>/',
+    ImageUploadDetailView.as_view(), name='image_upload_detail'
     ),
                path(
     'recipes/<int:pk>/favorite/',
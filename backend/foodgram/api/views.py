@@ -1,54 +1,92 @@
+import os
+import re
+
+from api.bulk import export_recipes, import_recipes
+from api.cache import recipe_tags
 from api.filters import IngredientFilter, RecipeFilter
-# from api.pagination import CustomPagination
+from api.mixins import (CachedResponseMixin, ConditionalGetMixin,
+                        RecipePayloadMixin)
+from api.pagination import FeedPagination, RecipePagination
 from api.permissions import IsCreateOnly, IsRecipeAuthor
-from api.serializers import (IngredientSerializer, RecipeCreateSerializer,
-                             RecipeSerializer, RecipeShortSerializer,
-                             SetPasswordSerializer, ShoppingListSerializer,
-                             TagSerializer, UserCreateSerializer,
-                             UserRecieveTokenSerializer, UserSerializer,
-                             UserSubscriptionSerializer)
-from django.db.models import Count, F, Sum
-from django.http import HttpResponse
+from api.serializers import (ImageUploadSerializer, IngredientSerializer,
+                             RecipeCreateSerializer, RecipeSerializer,
+                             RecipeShortSerializer, SetPasswordSerializer,
+                             ShoppingListSerializer, TagSerializer,
+                             UserCreateSerializer, UserRecieveTokenSerializer,
+                             UserSerializer, UserSubscriptionSerializer)
+from api.shopping_cart import EXPORTERS, cart_rows
+from api.throttling import AdmissionControlMixin
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db.models import (BooleanField, F, Prefetch, Value, Window,
+                              prefetch_related_objects)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recepies.models import (Ingredient, Recipe, RecipeIngredient,
+from foodgram.db.pool import get_stats as get_database_stats
+from jobs.models import Job
+from jobs.queue import enqueue
+from recepies import cart, uploads
+from recepies.feed import Feed
+from recepies.models import (ImageUpload, Ingredient, Recipe, RecipeIngredient,
                              ShoppingList, Tag)
 from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
 from rest_framework.generics import CreateAPIView
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import HTTP_201_CREATED
 from rest_framework.views import APIView
 from users.models import User
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, CachedResponseMixin,
+                 viewsets.ReadOnlyModelViewSet):
+    cache_list_tag = 'tags'
+    cache_object_tag = 'tag'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = [AllowAny]
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, CachedResponseMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    cache_list_tag = 'ingredients'
+    cache_object_tag = 'ingredient'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     permission_classes = [AllowAny]
     filter_backends = (IngredientFilter,)
-    search_fields = ('^name',)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AdmissionControlMixin, CachedResponseMixin,
+                    RecipePayloadMixin, viewsets.ModelViewSet):
+    cache_list_tag = 'recipes'
+    cache_object_tag = 'recipe'
     serializer_class = RecipeSerializer
     ordering_fields = ('pub_date',)
-    queryset = Recipe.objects.all().order_by('-pub_date')
+    queryset = Recipe.objects.all().order_by('-pub_date', '-id')
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
     permission_classes = [IsRecipeAuthor]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Multipart images are streamed to a temporary file, not memory.
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_admission_scope(self):
+        if self.action in ('create', 'update', 'partial_update'):
+            return 'recipe_write'
+        return None
+
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
             return RecipeCreateSerializer
@@ -58,6 +96,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.only('id', 'pub_date', 'updated_at', 'author')
         is_favorited = self.request.query_params.get('is_favorited')
         is_in_shopping_cart = self.request.query_params.get(
             'is_in_shopping_cart'
@@ -72,17 +112,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         return queryset
 
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve', 'feed'):
+            kwargs.update(RecipeSerializer.get_fields_kwargs(
+                self.request, compact=self.action != 'retrieve'
+            ))
+        return super().get_serializer(*args, **kwargs)
+
+    def get_payload_queryset(self, fields):
+        queryset = Recipe.objects.all()
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredients'
+                )
+            ))
+        if 'text' in fields:
+            return queryset
+        return queryset.defer('text')
+
+    def get_cache_tags(self, data):
+        recipes = data.get('results', [data])
+        tags = set().union(*map(recipe_tags, recipes))
+        if 'favorites' in self.request.query_params.get('ordering', ''):
+            tags.add('favorites')
+        return tags
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def retrieve(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        serializer = RecipeSerializer(
-            instance=recipe,
-            context={'request': request}
-        )
-        return Response(serializer.data)
-
     @action(
             detail=True, methods=['POST', 'DELETE'],
             url_path='favorite', url_name='recipe_favorite',
@@ -92,7 +155,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         user = request.user
         if request.method == 'POST':
-            user.favorite_recipes.add(recipe)
+            user.add_favorite(recipe)
             serializer = RecipeSerializer(
                 instance=recipe, context={'request': request}
             )
@@ -100,10 +163,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 serializer.data, status=status.HTTP_201_CREATED
             )
         if request.method == 'DELETE':
-            user.favorite_recipes.remove(recipe)
+            user.remove_favorite(recipe)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+            detail=False, methods=['GET'],
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination,
+            )
+    def feed(self, request):
+        recipes = self.paginate_queryset(Feed(request.user))
+        fields = tuple(self.get_serializer().fields)
+        return self.get_conditional_response(
+            request, *self.get_recipe_validators(recipes, fields, []),
+            lambda: self.get_paginated_response(
+                self.get_recipe_payloads(recipes, fields)
+            )
+        )
+
 
 class ShoppingListViewSet(viewsets.ModelViewSet):
     serializer_class = ShoppingListSerializer
@@ -111,10 +189,7 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         recipe = get_object_or_404(Recipe, id=self.kwargs['pk'])
-        shopping_list, created = ShoppingList.objects.get_or_create(
-            user=request.user
-        )
-        shopping_list.recipes.add(recipe)
+        shopping_list = cart.add_recipe(request.user, recipe)
         serializer = self.serializer_class(
             shopping_list, context={"request": request}
         )
@@ -130,38 +205,153 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         recipe = get_object_or_404(Recipe, id=self.kwargs['pk'])
         shopping_list = get_object_or_404(ShoppingList, user=request.user)
-        shopping_list.recipes.remove(recipe)
+        cart.remove_recipe(shopping_list, recipe)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ShoppingCartDownloadView(APIView):
+class ShoppingCartDownloadView(AdmissionControlMixin, APIView):
+    admission_scope = 'cart_download'
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= selects the file type here, not a DRF renderer.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        export_format = request.query_params.get('format', 'txt')
+        exporter = EXPORTERS.get(export_format)
+        if exporter is None:
+            return Response(
+                {'format': f"Доступные форматы: {', '.join(EXPORTERS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = StreamingHttpResponse(
+            exporter.render(cart_rows(request.user)),
+            content_type=exporter.content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{export_format}"'
+        )
+        return response
+
+
+class RecipeImportView(APIView):
+    """Import NDJSON recipes from the request body, see api.bulk."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        report = import_recipes(request.stream or (), request.user)
+        return Response(report)
+
+
+class RecipeExportView(APIView):
+    """Stream the NDJSON export, or queue writing it to the storage."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        job = enqueue('api.export_recipes', dedup_key='recipe-export')
+        return Response(
+            {'job': job.pk}, status=status.HTTP_202_ACCEPTED
+        )
 
     def get(self, request):
-        ingredients = RecipeIngredient.objects.select_related(
-            'recipe', 'ingredients'
-        ).filter(
-            recipe__shopping_lists__user=request.user,
-        ).values(
-            name=F('ingredients__name'),
-            units=F('ingredients__units')
-        ).annotate(
-            total=Sum('amount')
+        response = StreamingHttpResponse(
+            export_recipes(), content_type='application/x-ndjson'
         )
-        ingredients_str = ''
-        for ingredient in ingredients:
-            name = ingredient['name']
-            amount = ingredient['total']
-            measurement_unit = ingredient['units']
-            ingredients_str += f"{name} ({measurement_unit}) — {amount}\n"
-        response = HttpResponse(content_type='text/plain')
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            'attachment; filename="recipes.ndjson"'
         )
-        response.write(ingredients_str)
         return response
 
 
-class UserReceiveTokenViewSet(CreateAPIView):
+class ImageUploadView(APIView):
+    """Start a chunked image upload of `size` bytes, see recepies.uploads."""
+
+    def post(self, request):
+        try:
+            size = int(request.data.get('size', 0))
+            upload = uploads.create(request.user, size)
+        except (TypeError, ValueError):
+            return Response(
+                {'size': ['Укажите размер в байтах.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except uploads.UploadError as error:
+            return Response(
+                {'size': [str(error)]}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            ImageUploadSerializer(upload).data, status=HTTP_201_CREATED
+        )
+
+
+class ImageUploadDetailView(APIView):
+    """Progress of an upload and its next chunk.
+
+    A chunk is the raw request body with a `Content-Range: bytes
+    <first>-<last>/<size>` header; it has to start at `received`.
+    """
+    content_range = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+    def get_upload(self, pk):
+        return get_object_or_404(ImageUpload, pk=pk, user=self.request.user)
+
+    def get(self, request, pk):
+        return Response(ImageUploadSerializer(self.get_upload(pk)).data)
+
+    def put(self, request, pk):
+        upload = self.get_upload(pk)
+        match = self.content_range.match(
+            request.headers.get('Content-Range', '')
+        )
+        if match is None or request.stream is None:
+            return Response(
+                {'errors': 'Нужны заголовок Content-Range и тело запроса.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        first, last = int(match[1]), int(match[2])
+        try:
+            upload = uploads.append(
+                upload, request.stream, first, last - first + 1
+            )
+        except uploads.InvalidImage as error:
+            uploads.discard(upload)
+            return Response(
+                {'errors': str(error)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except uploads.UploadError as error:
+            upload.refresh_from_db()
+            return Response(
+                {'errors': str(error), **ImageUploadSerializer(upload).data},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(ImageUploadSerializer(upload).data)
+
+
+class RecipeExportJobView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk):
+        job = get_object_or_404(Job, pk=pk, name='api.export_recipes')
+        data = {'status': job.status, 'attempts': job.attempts}
+        if job.status == Job.DONE:
+            data['url'] = request.build_absolute_uri(
+                default_storage.url(job.result['path'])
+            )
+        return Response(data)
+
+
+class DatabaseStatsView(APIView):
+    """Connection counters of the worker process serving the request."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {'pid': os.getpid(), 'databases': get_database_stats()}
+        )
+
+
+class UserReceiveTokenViewSet(AdmissionControlMixin, CreateAPIView):
+    admission_scope = 'login'
     queryset = User.objects.all()
     serializer_class = UserRecieveTokenSerializer
     permission_classes = [AllowAny]
@@ -195,6 +385,7 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer_class = UserCreateSerializer
         else:
             serializer_class = UserSerializer
+            kwargs.update(UserSerializer.get_fields_kwargs(self.request))
         kwargs['context'] = {'request': self.request}
         return serializer_class(*args, **kwargs)
 
@@ -208,7 +399,8 @@ class UserViewSet(viewsets.ModelViewSet):
     def get_me_data(self, request):
         """Getting user data."""
         serializer = UserSerializer(
-            request.user, context={'request': request}
+            request.user, context={'request': request},
+            **UserSerializer.get_fields_kwargs(request)
         )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -232,7 +424,8 @@ class UserDeleteTokenViewSet(APIView):
             )
 
 
-class SetPasswordView(APIView):
+class SetPasswordView(AdmissionControlMixin, APIView):
+    admission_scope = 'set_password'
     serializer_class = SetPasswordSerializer
 
     def post(self, request):
@@ -245,13 +438,38 @@ class SetPasswordView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
                 )
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
         return Response(
             {'message': 'Password updated successfully'},
             status=status.HTTP_200_OK
             )
 
 
+def latest_recipes(author_ids, limit):
+    """Prefetch of the newest recipes of the authors into latest_recipes.
+
+    ROW_NUMBER() over the recipes of each author picks the first `limit`
+    of them in one query, whatever the number of authors.
+    """
+    ranked = Recipe.objects.filter(author_id__in=author_ids).annotate(
+        recipe_rank=Window(
+            RowNumber(), partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        )
+    ).values('id', 'recipe_rank')
+    sql, params = ranked.query.sql_with_params()
+    return Prefetch(
+        'recipe_set',
+        queryset=Recipe.objects.filter(pk__in=RawSQL(
+            f'SELECT id FROM ({sql}) ranked WHERE recipe_rank <= %s',
+            (*params, limit)
+        )).only(
+            'id', 'author_id', 'name', 'image', 'cooking_time', 'pub_date'
+        ).order_by('-pub_date', '-id'),
+        to_attr='latest_recipes'
+    )
+
+
 class UserSubscriptionsView(APIView):
     pagination_class = PageNumberPagination
 
@@ -276,32 +494,33 @@ class UserSubscriptionsView(APIView):
         return self.paginator.get_paginated_response(data)
 
     def get(self, request):
-        user = request.user
-        subscriptions = user.subscriptions.all()
-        recipes_count = Recipe.objects.filter(
-            author__in=subscriptions
-        ).values('author').annotate(count=Count('author'))
-        serializer = UserSubscriptionSerializer(
-            subscriptions, many=True,
-            context={'request': request}
+        serializer_kwargs = UserSubscriptionSerializer.get_fields_kwargs(
+            request
         )
-        serializer_data = serializer.data
-        for user_data in serializer_data:
-            user_id = user_data['id']
-            recipe_count = next(
-                (item[
-                    'count'
-                ] for item in recipes_count if item[
-                    'author'
-                ] == user_id), 0
+        fields = UserSubscriptionSerializer(**serializer_kwargs).fields
+        subscriptions = request.user.subscriptions.annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
+        page = self.paginate_queryset(
+            subscriptions, request=request, view=self
+        )
+        recipes_limit = self.get_recipes_limit(request)
+        if 'recipes' in fields and page:
+            prefetch_related_objects(
+                page, latest_recipes([user.pk for user in page], recipes_limit)
             )
-            user_data['recipes_count'] = recipe_count
-        paginated_data = self.paginate_queryset(
-            serializer_data,
-            request=request,
-            view=self
+        serializer = UserSubscriptionSerializer(
+            page, many=True,
+            context={'request': request, 'recipes_limit': recipes_limit},
+            **serializer_kwargs
         )
-        return self.get_paginated_response(paginated_data)
+        return self.get_paginated_response(serializer.data)
+
+    def get_recipes_limit(self, request):
+        try:
+            return max(int(request.query_params['recipes_limit']), 0)
+        except (KeyError, ValueError):
+            return UserSubscriptionSerializer.recipes_limit
 
     def post(self, request, user_id):
         target_user = get_object_or_404(User, id=user_id)
@@ -311,13 +530,10 @@ class UserSubscriptionsView(APIView):
         serializer = UserSubscriptionSerializer(
             user, context={'request': request}
         )
-        recipes_count = Recipe.objects.filter(
-            author=target_user
-        ).count()
         user.subscribe_to_user(target_user)
         serializer_data = serializer.data
         serializer_data['is_subscribed'] = True
-        serializer_data['recipes_count'] = recipes_count
+        serializer_data['recipes_count'] = target_user.recipes_count
         return Response(serializer_data)
 
     def delete(self, request, user_id):
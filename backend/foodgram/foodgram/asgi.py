@@ -3,5 +3,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ROOT_URLCONF', 'foodgram.urls_asgi')
 
 application = get_asgi_application()
+
+from api.ingredient_index import warm_up  # noqa: E402
+
+warm_up()
@@ -0,0 +1,21 @@
+"""Database backends with managed connections.
+
+ENGINE 'foodgram.db.postgresql' ('foodgram.db.sqlite3' for local runs)
+is the stock Django backend with two more settings of the alias:
+
+* HEALTH_CHECKS: a persistent connection (CONN_MAX_AGE) is checked
+  before it is reused by a request, so a connection dropped by the
+  server or a proxy is replaced instead of failing that request;
+* POOL = {'SIZE': ..., 'TIMEOUT': ..., 'RECYCLE': ...}: the threads of
+  a process share up to SIZE connections, taken for a request or a job
+  and returned when it ends, instead of one connection per thread.
+
+Counters of connects, reconnects, checkouts and waits by alias are
+returned by foodgram.db.pool.get_stats(). Replicas listed in
+DATABASE_REPLICAS serve the reads of safe requests, see
+foodgram.db.routers.
+"""
+BACKENDS = {
+    'postgresql': 'foodgram.db.postgresql',
+    'sqlite': 'foodgram.db.sqlite3',
+}
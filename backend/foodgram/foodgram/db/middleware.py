@@ -0,0 +1,45 @@
+import random
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import caches
+from foodgram.db.routers import Reads, current
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = 'db:sticky:{}'
+
+
+class ReplicaRoutingMiddleware:
+    """Set the replica reads of the request, see foodgram.db.routers."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def sticky_key(request):
+        """Key of the client: its token or session, None if anonymous."""
+        credentials = request.META.get('HTTP_AUTHORIZATION') or (
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        if not credentials:
+            return None
+        return STICKY_KEY.format(sha256(credentials.encode()).hexdigest())
+
+    def __call__(self, request):
+        cache = caches[settings.DATABASE_STICKY_CACHE]
+        key = self.sticky_key(request)
+        replica = None
+        if (
+            settings.DATABASE_REPLICAS and request.method in SAFE_METHODS
+            and not (key and cache.get(key))
+        ):
+            replica = random.choice(settings.DATABASE_REPLICAS)
+        state = Reads(replica)
+        token = current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        if state.wrote and key:
+            cache.set(key, True, settings.DATABASE_STICKY_SECONDS)
+        return response
@@ -0,0 +1,106 @@
+import weakref
+
+from django.utils.functional import cached_property
+from foodgram.db.pool import PoolTimeout, get_metrics, get_pool
+
+
+def ping(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+
+
+class ManagedConnectionMixin:
+    """Health checks and pooling for a Django DatabaseWrapper.
+
+    With HEALTH_CHECKS a connection kept from an earlier request is
+    pinged before its first query in the next one and replaced if the
+    server has dropped it. With POOL the raw connection goes back to the
+    pool of the alias when Django closes it and at the end of every
+    request, and is taken from there by the next connect().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool_created = None
+        self.pool_finalizer = None
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get('HEALTH_CHECKS', False)
+
+    @cached_property
+    def metrics(self):
+        return get_metrics(self.alias)
+
+    @cached_property
+    def pool(self):
+        options = self.settings_dict.get('POOL') or {}
+        if not options.get('SIZE'):
+            return None
+        return get_pool(self.alias, options)
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        if self.pool is None:
+            self.metrics.count('connects')
+            return connect(conn_params)
+        try:
+            connection, self.pool_created = self.pool.checkout(
+                lambda: connect(conn_params),
+                ping if self.health_checks else None
+            )
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+        # A wrapper dropped with its thread gives its place back.
+        self.pool_finalizer = weakref.finalize(self, self.pool.release)
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        if self.pool is None or self.pool_finalizer is None:
+            self.metrics.count('closes')
+            super()._close()
+            return
+        self.pool_finalizer.detach()
+        self.pool_finalizer = None
+        if self.in_atomic_block or self.errors_occurred:
+            self.pool.discard(self.connection)
+            return
+        try:
+            self.connection.rollback()
+        except Exception:
+            self.pool.discard(self.connection)
+        else:
+            self.pool.checkin(self.connection, self.pool_created)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if self.connection is None or self.in_atomic_block:
+            return
+        if self.pool is not None:
+            # Between requests the connection serves the other threads.
+            self.close()
+        else:
+            self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None or self.health_check_done
+            or not self.health_checks or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            self.metrics.count('reconnects')
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,175 @@
+import threading
+from collections import Counter
+from time import monotonic
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionMetrics:
+    """Counters of the connections of one database alias."""
+
+    NAMES = (
+        'connects', 'reconnects', 'closes', 'checkouts', 'waits', 'timeouts'
+    )
+
+    def __init__(self):
+        self.counters = Counter(dict.fromkeys(self.NAMES, 0))
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counters = Counter(dict.fromkeys(self.NAMES, 0))
+
+
+class ConnectionPool:
+    """Open connections of one alias shared by the threads of a process.
+
+    At most `size` connections are open, idle or checked out; a checkout
+    while all of them are in use waits up to `timeout` seconds for one
+    to be returned. Connections older than `recycle` seconds are closed
+    instead of being returned.
+    """
+
+    def __init__(self, metrics, size, timeout=10, recycle=None):
+        self.metrics = metrics
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle = []
+        self.opened = 0
+        self.condition = threading.Condition()
+
+    def reserve(self):
+        """An idle (connection, created) pair, None to open a new one."""
+        deadline = None
+        with self.condition:
+            self.metrics.count('checkouts')
+            while not self.idle and self.opened >= self.size:
+                if deadline is None:
+                    self.metrics.count('waits')
+                    deadline = monotonic() + self.timeout
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self.metrics.count('timeouts')
+                    raise PoolTimeout(
+                        f'No database connection freed in {self.timeout} s, '
+                        f'all {self.size} are in use.'
+                    )
+                self.condition.wait(remaining)
+            if self.idle:
+                return self.idle.pop()
+            self.opened += 1
+            return None
+
+    def checkout(self, connect, ping=None):
+        """A connection from the pool and the time it was opened.
+
+        A reused connection is checked with `ping` first, if given, and
+        replaced when the server has dropped it.
+        """
+        entry = self.reserve()
+        if entry is not None:
+            connection, created = entry
+            if ping is None or self.is_usable(connection, ping):
+                return connection, created
+            self.metrics.count('reconnects')
+            self.close(connection)
+        try:
+            connection = connect()
+        except Exception:
+            self.release()
+            raise
+        self.metrics.count('connects')
+        return connection, monotonic()
+
+    def checkin(self, connection, created):
+        if self.recycle is not None and monotonic() - created > self.recycle:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, created))
+            self.condition.notify()
+
+    def discard(self, connection):
+        self.close(connection)
+        self.release()
+
+    def release(self):
+        """Free the place of a connection that is not coming back."""
+        with self.condition:
+            self.opened -= 1
+            self.condition.notify()
+
+    def close(self, connection):
+        self.metrics.count('closes')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def clear(self):
+        """Close the idle connections."""
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            self.discard(connection)
+
+    @staticmethod
+    def is_usable(connection, ping):
+        try:
+            ping(connection)
+        except Exception:
+            return False
+        return True
+
+    @property
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'open': self.opened,
+                'idle': len(self.idle),
+                'in_use': self.opened - len(self.idle),
+            }
+
+
+_metrics = {}
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_metrics(alias):
+    with _lock:
+        return _metrics.setdefault(alias, ConnectionMetrics())
+
+
+def get_pool(alias, options):
+    """The pool of the alias, created with its POOL settings if needed."""
+    metrics = get_metrics(alias)
+    with _lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                metrics, options['SIZE'], options.get('TIMEOUT', 10),
+                options.get('RECYCLE')
+            )
+        return _pools[alias]
+
+
+def get_stats():
+    """Counters and, for pooled aliases, the pool state by alias."""
+    with _lock:
+        aliases = dict(_metrics)
+        pools = dict(_pools)
+    stats = {}
+    for alias, metrics in aliases.items():
+        with metrics.lock:
+            stats[alias] = dict(metrics.counters)
+        if alias in pools:
+            stats[alias].update(pools[alias].stats)
+    return stats
@@ -0,0 +1,6 @@
+from django.db.backends.postgresql import base
+from foodgram.db.mixins import ManagedConnectionMixin
+
+
+class DatabaseWrapper(ManagedConnectionMixin, base.DatabaseWrapper):
+    pass
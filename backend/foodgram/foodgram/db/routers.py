@@ -0,0 +1,89 @@
+"""Reads of safe requests from replicas, everything else from default.
+
+ReplicaRoutingMiddleware picks a replica of DATABASE_REPLICAS for each
+GET, HEAD or OPTIONS request and keeps it in a context variable, which
+follows the request into sync_to_async threads. Queries outside such a
+request (other methods, jobs, commands) and reads inside a transaction
+or after a write of the request go to default. A client whose request
+wrote is read from default for DATABASE_STICKY_SECONDS afterwards, so
+it sees its own change even while the replicas lag behind.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+WRITES = {'INSERT', 'UPDATE', 'DELETE', 'REPLACE'}
+
+
+class Reads:
+    """Routing state of one request."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+current = ContextVar('database_reads', default=None)
+
+
+def mark_writes(execute, sql, params, many, context):
+    """Execute wrapper noting that the request wrote to default."""
+    state = current.get()
+    if state is not None and not state.wrote:
+        words = sql.split(None, 1)
+        state.wrote = bool(words) and words[0].upper() in WRITES
+    return execute(sql, params, many, context)
+
+
+# db_for_write is also asked on FK assignment to unsaved instances, so
+# writes are noted where their SQL is executed.
+@receiver(connection_created)
+def install_write_marker(sender, connection, **kwargs):
+    if (
+        connection.alias == DEFAULT_DB_ALIAS
+        and mark_writes not in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(mark_writes)
+
+
+@contextmanager
+def primary():
+    """Read from default within the block."""
+    state = current.get()
+    if state is None or state.replica is None:
+        yield
+        return
+    replica, state.replica = state.replica, None
+    try:
+        yield
+    finally:
+        state.replica = replica
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema from the primary.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -26,10 +26,12 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'recepies',
     'users.apps.UsersConfig',
-    'api.apps.ApiConfig'
+    'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig'
 ]
 
 MIDDLEWARE = [
+    'foodgram.db.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,7 +41,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', default='foodgram.urls')
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
@@ -60,18 +62,104 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', default=16))
+
 
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
+        'ENGINE': os.getenv('DB_ENGINE', default='foodgram.db.postgresql'),
         'NAME': os.getenv('DB_NAME', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='localhost'),
         'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'HEALTH_CHECKS': True,
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', default=0)),
+            'TIMEOUT': 10,
+            'RECYCLE': 1800,
+        },
+    }
+}
+
+# Comma separated hosts of read replicas, SQLite files for local runs.
+DATABASE_REPLICAS = []
+for index, location in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(','))
+):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3')
+        else 'HOST': location,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['foodgram.db.routers.ReplicaRouter']
+DATABASE_STICKY_SECONDS = int(os.getenv('DB_STICKY_SECONDS', default=5))
+DATABASE_STICKY_CACHE = 'default'
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='/tmp/foodgram_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=300))
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+RECIPE_SEARCH_CONFIG = 'russian'
+
+# Authors above either limit are not copied into subscriber feeds and are
+# read from the recipes table when a feed is requested instead.
+FEED_FANOUT_MAX_SUBSCRIBERS = int(
+    os.getenv('FEED_FANOUT_MAX_SUBSCRIBERS', default=1000)
+)
+FEED_FANOUT_MAX_RECIPES = int(
+    os.getenv('FEED_FANOUT_MAX_RECIPES', default=1000)
+)
+
+TOKEN_AUTH_LOCAL_SIZE = 10000
+TOKEN_AUTH_LOCAL_TTL = int(os.getenv('TOKEN_AUTH_LOCAL_TTL', default=30))
+TOKEN_AUTH_SHARED_CACHE = os.getenv('TOKEN_AUTH_SHARED_CACHE') or None
+TOKEN_AUTH_SHARED_TTL = int(os.getenv('TOKEN_AUTH_SHARED_TTL', default=300))
+
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', default='file')
+THROTTLE_DIR = os.getenv('THROTTLE_DIR', default='/tmp/foodgram_throttle')
+THROTTLE_RATES = {
+    'login': {'ip': '10/m'},
+    'set_password': {'ip': '10/m', 'user': '3/m'},
+    'recipe_write': {'user': '30/m'},
+    'cart_download': {'user': '10/m'},
+}
+THROTTLE_CONCURRENCY = {
+    'login': 2,
+    'set_password': 2,
+    'recipe_write': 4,
+    'cart_download': 2,
+}
+THROTTLE_RETRY_AFTER = 1
+
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', default=4))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', default=1))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', default=5))
+JOBS_BACKOFF_BASE = 10
+JOBS_BACKOFF_MAX = 3600
+JOBS_TIMEOUT = int(os.getenv('JOBS_TIMEOUT', default=600))
+JOBS_KEEP_DAYS = 7
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -91,13 +179,14 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 }
 
 
@@ -138,4 +227,11 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_UPLOAD_DIR = os.getenv(
+    'IMAGE_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'uploads')
+)
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', default=20 * 1024 * 1024)
+)
+
 AUTH_USER_MODEL = 'users.User'
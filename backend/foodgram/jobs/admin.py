@@ -0,0 +1,37 @@
+from django.contrib import admin, messages
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'run_at', 'created_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ['retry']
+    empty_value_display = '-пусто-'
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Перезапустить')
+    def retry(self, request, queryset):
+        for job in queryset.filter(status=Job.FAILED):
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.QUEUED, attempts=0,
+                        run_at=timezone.now(), finished_at=None
+                    )
+            except IntegrityError:
+                self.message_user(
+                    request,
+                    f'Задача {job.pk} уже стоит в очереди с тем же ключом.',
+                    messages.WARNING
+                )
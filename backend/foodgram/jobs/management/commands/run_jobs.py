@@ -0,0 +1,29 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int,
+            help='Jobs run at once, JOBS_WORKERS by default.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Seconds between polls of an empty queue.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no job is due.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(options['threads'], options['poll_interval'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f'Worker {worker.name}, {worker.threads} threads')
+        worker.run(once=options['once'])
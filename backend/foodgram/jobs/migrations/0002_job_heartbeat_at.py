@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 07:09
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_running_jobs(apps, schema_editor):
+    Job = apps.get_model('jobs', 'Job')
+    Job.objects.filter(status='running').update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Отметка воркера'),
+        ),
+        migrations.RunPython(mark_running_jobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A call of a registered task, see jobs.queue."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.JSONField(
+        default=dict, blank=True, verbose_name='Аргументы'
+    )
+    dedup_key = models.CharField(
+        max_length=200, null=True, blank=True,
+        verbose_name='Ключ дедупликации'
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0, verbose_name='Попытки'
+    )
+    max_attempts = models.PositiveIntegerField(
+        default=5, verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Запустить после'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания'
+    )
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата запуска'
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата завершения'
+    )
+    worker = models.CharField(
+        max_length=100, blank=True, verbose_name='Воркер'
+    )
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Отметка воркера'
+    )
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=models.Q(status='queued'),
+                name='unique_queued_job_dedup_key'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='job_status_run_at_idx'
+            ),
+        ]
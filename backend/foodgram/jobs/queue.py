@@ -0,0 +1,138 @@
+"""A job queue kept in the database, no broker needed.
+
+Tasks are functions registered with `task` in the `tasks` modules of
+the apps. `enqueue` adds a Job row in the caller's transaction, so the
+job of a rolled back change never runs, and a job with the dedup key of
+another still queued job is not added twice. Workers of the run_jobs
+command claim due jobs with a conditional update, so a job is taken by
+one worker even when several poll the table, and failed jobs are
+retried with exponential backoff until max_attempts is reached. A worker
+marks the jobs it runs with a heartbeat; a running job is taken back
+only once its heartbeat is JOBS_TIMEOUT old, that is its worker is gone,
+so a slow job is never run twice at once.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from jobs.models import Job
+
+TASKS = {}
+
+
+def task(name):
+    """Register the decorated function as the task `name`."""
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+def enqueue(name, dedup_key=None, delay=None, max_attempts=None,
+            **payload):
+    """Queue a call of the task with JSON serializable keyword arguments.
+
+    Returns the new job, or the queued one with the same dedup key.
+    """
+    job = Job(
+        name=name, payload=payload, dedup_key=dedup_key,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS
+    )
+    if delay is not None:
+        job.run_at = timezone.now() + delay
+    if dedup_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Job.objects.filter(
+            dedup_key=dedup_key, status=Job.QUEUED
+        ).first()
+    return job
+
+
+def backoff(attempts):
+    """Delay before the next attempt, doubled after every failure."""
+    delay = min(
+        settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1),
+        settings.JOBS_BACKOFF_MAX
+    )
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(worker, limit):
+    """Mark up to `limit` due jobs as running by the worker."""
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'pk').values_list('pk', flat=True)[:limit * 2]
+    claimed = []
+    for pk in candidates:
+        if len(claimed) == limit:
+            break
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=now,
+            heartbeat_at=now, attempts=F('attempts') + 1
+        ):
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'pk'))
+
+
+def heartbeat(worker):
+    """Mark the jobs the worker is running as still in progress."""
+    Job.objects.filter(status=Job.RUNNING, worker=worker).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def finish(job, result=None):
+    Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, started_at=job.started_at
+    ).update(
+        status=Job.DONE, finished_at=timezone.now(), result=result,
+        last_error=''
+    )
+
+
+def fail(job, error):
+    """Queue the job again after a backoff or give up on it."""
+    running = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, started_at=job.started_at
+    )
+    if job.attempts < job.max_attempts:
+        try:
+            with transaction.atomic():
+                updated = running.update(
+                    status=Job.QUEUED, worker='', last_error=error,
+                    run_at=timezone.now() + backoff(job.attempts)
+                )
+        except IntegrityError:
+            error += '\nA newer job with the same dedup key is queued.'
+        else:
+            if updated:
+                return
+    running.update(
+        status=Job.FAILED, finished_at=timezone.now(), last_error=error
+    )
+
+
+def fail_stale(timeout):
+    """Fail the running jobs without a heartbeat within the timeout."""
+    silent = timezone.now() - timeout
+    for job in Job.objects.filter(
+        status=Job.RUNNING, heartbeat_at__lt=silent
+    ):
+        fail(job, f'Worker {job.worker} gone for {timeout}.')
+
+
+def purge(age):
+    """Delete the finished jobs older than `age`."""
+    return Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED],
+        finished_at__lt=timezone.now() - age
+    ).delete()[0]
@@ -0,0 +1,81 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from time import monotonic
+
+from django.conf import settings
+from django.db import close_old_connections
+from jobs import queue
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 3600
+
+
+class Worker:
+    """Runs queued jobs in a pool of threads until stopped."""
+
+    def __init__(self, threads=None, poll_interval=None):
+        self.threads = threads or settings.JOBS_WORKERS
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.purged_at = None
+        self.beaten_at = None
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def execute(self, job):
+        close_old_connections()
+        try:
+            function = queue.TASKS[job.name]
+            result = function(**job.payload)
+        except Exception:
+            logger.exception('Job %s %s failed', job.pk, job.name)
+            queue.fail(job, traceback.format_exc())
+        else:
+            queue.finish(job, result)
+        finally:
+            close_old_connections()
+
+    def maintain(self):
+        # A few heartbeats fit in the timeout, so a slow job is kept.
+        if self.beaten_at is None or (
+            monotonic() - self.beaten_at > settings.JOBS_TIMEOUT / 4
+        ):
+            queue.heartbeat(self.name)
+            self.beaten_at = monotonic()
+        queue.fail_stale(timedelta(seconds=settings.JOBS_TIMEOUT))
+        if self.purged_at is None or (
+            monotonic() - self.purged_at > PURGE_INTERVAL
+        ):
+            queue.purge(timedelta(days=settings.JOBS_KEEP_DAYS))
+            self.purged_at = monotonic()
+
+    def run(self, once=False):
+        """Poll for jobs; with `once` return when the queue is drained."""
+        running = set()
+        with ThreadPoolExecutor(
+            self.threads, thread_name_prefix='jobs'
+        ) as pool:
+            while not self.stopping.is_set():
+                self.maintain()
+                free = self.threads - len(running)
+                jobs = queue.claim(self.name, free) if free else []
+                running.update(pool.submit(self.execute, job) for job in jobs)
+                if once and not running:
+                    break
+                if jobs and len(running) < self.threads:
+                    continue
+                if running:
+                    done, running = wait(
+                        running, self.poll_interval, FIRST_COMPLETED
+                    )
+                else:
+                    self.stopping.wait(self.poll_interval)
+            wait(running)
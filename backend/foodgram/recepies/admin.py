@@ -1,6 +1,8 @@
 from django.contrib import admin
 
+from .cart import lock_recipe, recipe_changed
 from .models import Ingredient, Recipe, RecipeIngredient, Tag
+from .search import search_recipes
 
 
 class IngredientInline(admin.TabularInline):
@@ -11,9 +13,20 @@ class IngredientInline(admin.TabularInline):
 class RecipeAdmin(admin.ModelAdmin):
     inlines = [IngredientInline]
     list_display = ('pk', 'name', 'text', 'author',)
+    readonly_fields = Recipe.counter_fields
     search_fields = ('name', 'text',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_recipes(queryset, search_term), False
+
+    def save_related(self, request, form, formsets, change):
+        old_amounts = lock_recipe(form.instance)
+        super().save_related(request, form, formsets, change)
+        recipe_changed(form.instance, old_amounts)
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
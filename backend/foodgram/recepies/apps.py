@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def install_search(sender, using, **kwargs):
+    from recepies import search
+    search.install(connections[using])
 
 
 class RecepieApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recepies'
+
+    def ready(self):
+        from recepies import signals  # noqa: F401
+
+        post_migrate.connect(install_search, sender=self)
@@ -0,0 +1,173 @@
+"""Per-user ingredient totals of shopping carts.
+
+ShoppingListIngredient keeps the summed amount of every ingredient over
+the recipes in a user's cart. It is changed by deltas in the same
+transaction as the cart or the recipe. The recipe row is locked before
+the cart rows on every path, so concurrent changes of one recipe or one
+cart are applied one after another without deadlocking.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from recepies.models import (Recipe, RecipeIngredient, ShoppingList,
+                             ShoppingListIngredient)
+
+
+def _lock(queryset, field='pk'):
+    return list(
+        queryset.select_for_update().order_by('pk').values_list(
+            field, flat=True
+        )
+    )
+
+
+def recipe_amounts(recipe):
+    """Ingredient amounts of the recipe by ingredient id."""
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe).values_list(
+            'ingredients_id', 'amount'
+        )
+    )
+
+
+def apply_deltas(user_ids, deltas):
+    """Add amount deltas by ingredient id to the totals of the users.
+
+    Runs one bulk insert, one bulk update and one delete at most. The
+    carts of the users must be locked by the calling transaction.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not user_ids or not deltas:
+        return
+    rows = {
+        (row.user_id, row.ingredient_id): row
+        for row in ShoppingListIngredient.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+    }
+    created, changed, removed = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, delta in deltas.items():
+            row = rows.get((user_id, ingredient_id))
+            if row is None:
+                if delta > 0:
+                    created.append(ShoppingListIngredient(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=delta
+                    ))
+            elif row.amount + delta > 0:
+                row.amount += delta
+                changed.append(row)
+            else:
+                removed.append(row.pk)
+    ShoppingListIngredient.objects.bulk_create(created)
+    ShoppingListIngredient.objects.bulk_update(changed, ['amount'])
+    ShoppingListIngredient.objects.filter(pk__in=removed).delete()
+
+
+@transaction.atomic
+def add_recipe(user, recipe):
+    """Put the recipe into the user's cart, return the cart."""
+    _lock(Recipe.objects.filter(pk=recipe.pk))
+    shopping_list, _ = ShoppingList.objects.get_or_create(user=user)
+    _lock(ShoppingList.objects.filter(pk=shopping_list.pk))
+    if not shopping_list.recipes.filter(pk=recipe.pk).exists():
+        shopping_list.recipes.add(recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            in_carts_count=F('in_carts_count') + 1
+        )
+        apply_deltas([user.pk], recipe_amounts(recipe))
+        user.forget_relations()
+    return shopping_list
+
+
+@transaction.atomic
+def remove_recipe(shopping_list, recipe):
+    """Take the recipe out of the cart."""
+    _lock(Recipe.objects.filter(pk=recipe.pk))
+    _lock(ShoppingList.objects.filter(pk=shopping_list.pk))
+    if shopping_list.recipes.filter(pk=recipe.pk).exists():
+        shopping_list.recipes.remove(recipe)
+        Recipe.objects.filter(pk=recipe.pk, in_carts_count__gt=0).update(
+            in_carts_count=F('in_carts_count') - 1
+        )
+        apply_deltas([shopping_list.user_id], {
+            pk: -amount for pk, amount in recipe_amounts(recipe).items()
+        })
+
+
+def lock_recipe(recipe):
+    """Lock the recipe for a change of its ingredients.
+
+    Returns the current amounts, to be passed to recipe_changed once the
+    ingredients are saved in the same transaction.
+    """
+    _lock(Recipe.objects.filter(pk=recipe.pk))
+    return recipe_amounts(recipe)
+
+
+def recipe_changed(recipe, old_amounts, new_amounts=None):
+    """Carry a change of the recipe's ingredients over to the carts."""
+    deltas = Counter(
+        recipe_amounts(recipe) if new_amounts is None else new_amounts
+    )
+    deltas.subtract(old_amounts)
+    user_ids = _lock(
+        ShoppingList.objects.filter(recipes=recipe), 'user_id'
+    )
+    apply_deltas(user_ids, deltas)
+
+
+def expected_totals(user_ids=None):
+    """Totals computed from the carts, by (user id, ingredient id)."""
+    queryset = RecipeIngredient.objects.filter(
+        recipe__shopping_lists__isnull=False
+    )
+    if user_ids is not None:
+        queryset = queryset.filter(
+            recipe__shopping_lists__user_id__in=user_ids
+        )
+    rows = queryset.values_list(
+        'recipe__shopping_lists__user_id', 'ingredients_id'
+    ).annotate(total=Sum('amount')).order_by()
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in rows if total
+    }
+
+
+def stored_totals(user_ids=None):
+    queryset = ShoppingListIngredient.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in queryset.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        )
+    }
+
+
+def find_drift():
+    """Ids of the users whose stored totals differ from their carts."""
+    difference = expected_totals().items() ^ stored_totals().items()
+    return sorted({user_id for (user_id, _), _ in difference})
+
+
+@transaction.atomic
+def rebuild_totals(user_ids):
+    """Recompute the totals of the users from their carts."""
+    _lock(ShoppingList.objects.filter(user_id__in=user_ids))
+    ShoppingListIngredient.objects.filter(user_id__in=user_ids).delete()
+    ShoppingListIngredient.objects.bulk_create(
+        (
+            ShoppingListIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for (user_id, ingredient_id), total in expected_totals(
+                user_ids
+            ).items()
+        ),
+        batch_size=1000
+    )
@@ -0,0 +1,84 @@
+"""Denormalized counters of recipes and users.
+
+The write paths keep them current with F() updates; reconcile() resets
+the ones that drifted, e.g. after rows were removed in bulk.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+class CounterFieldsMixin:
+    """Leave the counter_fields out of saves of existing rows.
+
+    A save writes the values the instance was loaded with, so saving a
+    stale instance would undo the F() updates made since.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def get_counters(apps):
+    """(model, counter field, counted model, its foreign key) tuples.
+
+    Models come from `apps`, so migrations can pass their historical
+    registry.
+    """
+    recipe_model = apps.get_model('recepies', 'Recipe')
+    shopping_list_model = apps.get_model('recepies', 'ShoppingList')
+    user_model = apps.get_model('users', 'User')
+    return (
+        (
+            recipe_model, 'favorites_count',
+            user_model.favorite_recipes.through, 'recipe'
+        ),
+        (
+            recipe_model, 'in_carts_count',
+            shopping_list_model.recipes.through, 'recipe'
+        ),
+        (user_model, 'recipes_count', recipe_model, 'author'),
+        (
+            user_model, 'subscribers_count',
+            user_model.subscriptions.through, 'to_user'
+        ),
+    )
+
+
+def related_count(model, field):
+    """Number of `model` rows whose `field` points at the outer row."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile(model, counter, counted_model, field, dry_run=False):
+    """Recount the rows whose counter differs from the actual count.
+
+    Returns the number of such rows.
+    """
+    stale = list(
+        model.objects.annotate(
+            actual=related_count(counted_model, field)
+        ).exclude(**{counter: F('actual')}).values_list('pk', flat=True)
+    )
+    if not dry_run:
+        for start in range(0, len(stale), BATCH_SIZE):
+            model.objects.filter(
+                pk__in=stale[start:start + BATCH_SIZE]
+            ).update(**{counter: related_count(counted_model, field)})
+    return len(stale)
@@ -0,0 +1,129 @@
+"""Feeds of the newest recipes by the authors a user follows.
+
+Recipes are copied into FeedEntry rows of every subscriber when they are
+published (fan-out on write), so a feed page is one range scan over the
+subscriber's own rows. Authors with too many subscribers or recipes
+would make that copying expensive; their recipes stay out of the table
+and are merged in from the recipes table when the feed is read.
+
+An author is classified by their current counters, so recipes published
+while an author was above the limits are missing from feeds if the
+author later drops below them.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+from recepies.models import FeedEntry, Recipe
+from users.models import User
+
+BATCH_SIZE = 1000
+
+
+def pulled_authors():
+    """Authors read from the recipes table instead of the feed table."""
+    return (
+        Q(subscribers_count__gt=settings.FEED_FANOUT_MAX_SUBSCRIBERS)
+        | Q(recipes_count__gt=settings.FEED_FANOUT_MAX_RECIPES)
+    )
+
+
+def is_pulled(author_id):
+    return User.objects.filter(pulled_authors(), pk=author_id).exists()
+
+
+def create_entries(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out(recipe):
+    """Copy a new recipe into the feeds of its author's subscribers."""
+    fan_out_many([recipe])
+
+
+def fan_out_many(recipes):
+    """Copy new recipes into feeds, reading each author's subscribers once."""
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe)
+    pushed = User.objects.filter(pk__in=by_author).exclude(
+        pulled_authors()
+    ).values_list('pk', flat=True)
+    for author_id in pushed:
+        subscribers = User.subscriptions.through.objects.filter(
+            to_user_id=author_id
+        ).values_list('from_user_id', flat=True)
+        create_entries(
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe.pk,
+                author_id=author_id, pub_date=recipe.pub_date
+            )
+            for user_id in subscribers.iterator()
+            for recipe in by_author[author_id]
+        )
+
+
+def backfill(user, author):
+    """Copy the recipes of a newly followed author into the user's feed."""
+    if is_pulled(author.pk):
+        return
+    recipes = Recipe.objects.filter(author=author).values_list(
+        'pk', 'pub_date'
+    )
+    create_entries(
+        FeedEntry(
+            user_id=user.pk, recipe_id=pk, author_id=author.pk,
+            pub_date=pub_date
+        )
+        for pk, pub_date in recipes.iterator()
+    )
+
+
+def trim(user, author):
+    """Drop the recipes of an unfollowed author from the user's feed."""
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+class Feed:
+    """Feed of a user, read in pages newest first."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def page(self, position=None, limit=None):
+        """Recipes after the (pub_date, id) position, at most `limit`.
+
+        Both sources are read with the same keyset bound and limit and
+        merged, so a page costs two range scans at most.
+        """
+        pulled = list(self.user.subscriptions.filter(
+            pulled_authors()
+        ).values_list('pk', flat=True))
+        entries = FeedEntry.objects.filter(user=self.user).exclude(
+            author_id__in=pulled
+        )
+        if position is not None:
+            pub_date, pk = position
+            entries = entries.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, recipe_id__lt=pk)
+            )
+        rows = list(entries.order_by('-pub_date', '-recipe_id').values_list(
+            'pub_date', 'recipe_id'
+        )[:limit])
+        if pulled:
+            recipes = Recipe.objects.filter(author_id__in=pulled)
+            if position is not None:
+                recipes = recipes.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                )
+            rows += recipes.order_by('-pub_date', '-id').values_list(
+                'pub_date', 'id'
+            )[:limit]
+        ids = [pk for _, pk in sorted(set(rows), reverse=True)[:limit]]
+        recipes = Recipe.objects.filter(pk__in=ids).only(
+            'id', 'pub_date', 'updated_at', 'author'
+        ).in_bulk()
+        return [recipes[pk] for pk in ids if pk in recipes]
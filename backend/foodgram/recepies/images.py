@@ -0,0 +1,120 @@
+"""Resized variants of recipe images, built off the request path.
+
+A new image is processed by a job of the queue once the transaction
+that saved it commits. The original is stored under its SHA-256 and the
+variants under the same hash, so a picture uploaded twice is kept once.
+EXIF is dropped from the original and from the variants.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from jobs.queue import enqueue
+from PIL import Image, ImageOps, features
+from recepies.models import Recipe
+
+VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+if features.check('webp'):
+    FORMAT, EXTENSION = 'WEBP', 'webp'
+else:
+    FORMAT, EXTENSION = 'JPEG', 'jpg'
+QUALITY = 80
+ORIENTATION = 0x0112
+ORIGINALS_DIR = 'recipes/images'
+VARIANTS_DIR = 'recipes/variants'
+
+
+def needs_processing(recipe):
+    return (
+        bool(recipe.image)
+        and recipe.image_variants.get('original') != recipe.image.name
+    )
+
+
+def schedule(recipe):
+    """Queue the processing of the recipe's image."""
+    enqueue(
+        'recepies.process_recipe_image',
+        dedup_key=f'recipe-image:{recipe.pk}', pk=recipe.pk
+    )
+
+
+def encode(image, size):
+    variant = image.copy()
+    variant.thumbnail(size)
+    transparent = (
+        variant.mode in ('RGBA', 'LA', 'PA')
+        or 'transparency' in variant.info
+    )
+    variant = variant.convert(
+        'RGBA' if transparent and FORMAT == 'WEBP' else 'RGB'
+    )
+    buffer = BytesIO()
+    variant.save(buffer, FORMAT, quality=QUALITY)
+    return buffer.getvalue()
+
+
+def strip_metadata(image, data):
+    """Bytes of the original without EXIF, re-encoded only if it had any."""
+    exif = image.getexif()
+    if not exif:
+        return data
+    options = {}
+    if image.format == 'JPEG':
+        options['quality'] = 'keep' if exif.get(ORIENTATION, 1) == 1 else 95
+    buffer = BytesIO()
+    if exif.get(ORIENTATION, 1) == 1:
+        image.save(buffer, image.format, **options)
+    else:
+        ImageOps.exif_transpose(image).save(buffer, image.format, **options)
+    return buffer.getvalue()
+
+
+def store(path, content):
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+
+
+def process(pk):
+    """Store the hashed original and the variants of a recipe image."""
+    recipe = Recipe.objects.filter(pk=pk).only(
+        'image', 'image_variants'
+    ).first()
+    if recipe is None or not needs_processing(recipe):
+        return
+    source = recipe.image.name
+    with default_storage.open(source, 'rb') as file:
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    extension = os.path.splitext(source)[1].lower()
+    variants = {'original': f'{ORIGINALS_DIR}/{digest}{extension}'}
+    with Image.open(BytesIO(data)) as image:
+        store(variants['original'], strip_metadata(image, data))
+        image = ImageOps.exif_transpose(image)
+        for name, size in VARIANTS.items():
+            variants[name] = (
+                f'{VARIANTS_DIR}/{digest[:2]}/{digest}/{name}.{EXTENSION}'
+            )
+            store(variants[name], encode(image, size))
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(pk=pk).only(
+            'image', 'image_variants', 'updated_at'
+        ).first()
+        if recipe is None or recipe.image.name != source:
+            return
+        recipe.image = variants['original']
+        recipe.image_variants = variants
+        recipe.save(update_fields=['image', 'image_variants', 'updated_at'])
+    # Imported recipes may share a path; the last one processed frees it.
+    if (
+        source != variants['original']
+        and not Recipe.objects.filter(image=source).exists()
+    ):
+        default_storage.delete(source)
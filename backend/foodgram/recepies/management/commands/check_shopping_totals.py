@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from recepies.cart import find_drift, rebuild_totals
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the stored shopping cart totals with the carts and '
+        'report the users whose totals have drifted. Exits with status 1 '
+        'when any have, also after rebuilding them with --fix.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Rebuild the totals of the drifted users.'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = find_drift()
+        if not user_ids:
+            self.stdout.write('shopping cart totals are consistent')
+            return
+        message = (
+            f'{len(user_ids)} users with drifted totals: '
+            + ', '.join(map(str, user_ids))
+        )
+        if options['fix']:
+            rebuild_totals(user_ids)
+            message += f'\nrebuilt totals of {len(user_ids)} users'
+        raise CommandError(message)
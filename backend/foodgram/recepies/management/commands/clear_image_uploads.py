@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from recepies.uploads import clear_stale
+
+
+class Command(BaseCommand):
+    help = 'Discard chunked image uploads that were started long ago.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=24,
+            help='Age of the uploads to discard.'
+        )
+
+    def handle(self, *args, **options):
+        count = clear_stale(timedelta(hours=options['hours']))
+        self.stdout.write(f'discarded: {count}')
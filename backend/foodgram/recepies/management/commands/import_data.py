@@ -1,17 +1,136 @@
+import csv
 import json
+from functools import partial
+from itertools import islice
+from time import perf_counter
 
-from django.core.management.base import BaseCommand
+from api.cache import invalidate
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recepies.models import Ingredient
 
+READ_SIZE = 64 * 1024
+NAME_LENGTH = Ingredient._meta.get_field('name').max_length
+UNITS_LENGTH = Ingredient._meta.get_field('units').max_length
+
+
+def read_json(file):
+    """Items of a top-level JSON array, decoded one at a time."""
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    for chunk in iter(partial(file.read, READ_SIZE), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise CommandError('Expected a JSON array.')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            if end == len(buffer):
+                break
+            yield item
+            position = end
+    raise CommandError('Unexpected end of the JSON array.')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row and row != ['name', 'measurement_unit']:
+            yield {
+                'name': row[0],
+                'measurement_unit': row[1] if len(row) > 1 else '',
+            }
+
+
+READERS = {'json': read_json, 'csv': read_csv}
+
 
 class Command(BaseCommand):
+    help = (
+        'Load ingredients from a JSON or CSV file. Rows whose name and '
+        'measurement unit already exist are skipped, so reruns are safe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='/data/ingredients.json'
+        )
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Input format, taken from the file extension by default.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
 
     def handle(self, *args, **options):
-        with open('/data/ingredients.json', encoding='utf-8') as f:
-            data = json.load(f)
-
-        for item in data:
-            Ingredient.objects.create(
-                name=item['name'],
-                units=item['measurement_unit']
-            )
+        path = options['path']
+        input_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if input_format not in READERS:
+            raise CommandError(f'Unknown format of {path}.')
+        self.counts = {'inserted': 0, 'skipped': 0, 'invalid': 0}
+        self.seen = set()
+        started = perf_counter()
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = READERS[input_format](file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                self.save_batch(batch)
+        spent = perf_counter() - started
+        if self.counts['inserted']:
+            invalidate('ingredients')
+        total = sum(self.counts.values())
+        counts = ', '.join(
+            f'{name}: {count}' for name, count in self.counts.items()
+        )
+        self.stdout.write(
+            f'{counts}; {total} rows in {spent:.2f} s, '
+            f'{total / spent:.0f} rows/s'
+        )
+
+    def get_key(self, row):
+        """(name, units) of a valid row, None otherwise."""
+        if not isinstance(row, dict):
+            return None
+        name = str(row.get('name') or '').strip()
+        units = str(row.get('measurement_unit') or '').strip()
+        if not name or len(name) > NAME_LENGTH or len(units) > UNITS_LENGTH:
+            return None
+        return name, units
+
+    @transaction.atomic
+    def save_batch(self, batch):
+        keys = []
+        for row in batch:
+            key = self.get_key(row)
+            if key is None:
+                self.counts['invalid'] += 1
+            elif key in self.seen:
+                self.counts['skipped'] += 1
+            else:
+                self.seen.add(key)
+                keys.append(key)
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in keys}
+        ).values_list('name', 'units')) & set(keys)
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, units=units)
+                for name, units in keys if (name, units) not in existing
+            ),
+            ignore_conflicts=True
+        )
+        self.counts['inserted'] += len(keys) - len(existing)
+        self.counts['skipped'] += len(existing)
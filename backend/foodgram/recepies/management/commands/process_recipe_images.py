@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from recepies.images import needs_processing, process
+from recepies.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Build the resized variants of recipe images that lack them.'
+
+    def handle(self, *args, **options):
+        pks = [
+            recipe.pk
+            for recipe in Recipe.objects.only(
+                'image', 'image_variants'
+            ).iterator()
+            if needs_processing(recipe)
+        ]
+        failed = 0
+        for pk in pks:
+            try:
+                process(pk)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'Recipe {pk}: {error}')
+        self.stdout.write(
+            f'processed: {len(pks) - failed}, failed: {failed}'
+        )
@@ -0,0 +1,25 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from recepies.counters import get_counters, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount favorites, carts, recipes and subscribers counters '
+        'that differ from the actual relations.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the drifted counters.'
+        )
+
+    def handle(self, *args, **options):
+        for model, counter, counted_model, field in get_counters(apps):
+            stale = reconcile(
+                model, counter, counted_model, field, options['dry_run']
+            )
+            self.stdout.write(
+                f'{model._meta.label}.{counter}: {stale} drifted'
+            )
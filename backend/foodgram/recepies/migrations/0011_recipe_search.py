@@ -0,0 +1,21 @@
+from django.db import migrations
+from recepies import search
+
+
+def install(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recepies', '0010_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
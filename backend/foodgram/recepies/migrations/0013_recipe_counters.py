@@ -0,0 +1,66 @@
+# Generated by Django 3.2 on 2026-10-18 06:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def related_count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    recipe_model = apps.get_model('recepies', 'Recipe')
+    shopping_list_model = apps.get_model('recepies', 'ShoppingList')
+    user_model = apps.get_model('users', 'User')
+    counters = (
+        (
+            recipe_model, 'favorites_count',
+            user_model.favorite_recipes.through, 'recipe'
+        ),
+        (
+            recipe_model, 'in_carts_count',
+            shopping_list_model.recipes.through, 'recipe'
+        ),
+        (user_model, 'recipes_count', recipe_model, 'author'),
+        (
+            user_model, 'subscribers_count',
+            user_model.subscriptions.through, 'to_user'
+        ),
+    )
+    for model, counter, counted_model, field in counters:
+        model.objects.update(
+            **{counter: related_count(counted_model, field)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recepies', '0012_shoppinglistingredient'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в списки покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-pub_date', '-id'], name='recipe_favorites_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
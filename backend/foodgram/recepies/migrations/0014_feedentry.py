@@ -0,0 +1,66 @@
+# Generated by Django 3.2 on 2026-10-18 06:14
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('recepies', 'Recipe')
+    FeedEntry = apps.get_model('recepies', 'FeedEntry')
+    subscriptions = User.subscriptions.through.objects.exclude(
+        Q(to_user__subscribers_count__gt=(
+            settings.FEED_FANOUT_MAX_SUBSCRIBERS
+        ))
+        | Q(to_user__recipes_count__gt=settings.FEED_FANOUT_MAX_RECIPES)
+    ).values_list('from_user_id', 'to_user_id')
+    for user_id, author_id in subscriptions.iterator():
+        FeedEntry.objects.bulk_create(
+            FeedEntry(
+                user_id=user_id, recipe_id=pk, author_id=author_id,
+                pub_date=pub_date
+            )
+            for pk, pub_date in Recipe.objects.filter(
+                author_id=author_id
+            ).values_list('pk', 'pub_date')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recepies', '0013_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата добавления')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recepies.recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_entry_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_entry_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
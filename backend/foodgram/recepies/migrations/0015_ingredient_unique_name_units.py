@@ -0,0 +1,57 @@
+# Generated by Django 3.2 on 2026-10-18 06:17
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_rows(model, owner, field, keep, ids):
+    """Point rows at the kept ingredient, summing per-owner duplicates."""
+    groups = defaultdict(list)
+    for row in model.objects.filter(**{f'{field}_id__in': ids}):
+        groups[getattr(row, f'{owner}_id')].append(row)
+    for rows in groups.values():
+        rows.sort(key=lambda row: getattr(row, f'{field}_id') != keep)
+        target, rest = rows[0], rows[1:]
+        model.objects.filter(pk__in=[row.pk for row in rest]).delete()
+        target.amount += sum(row.amount for row in rest)
+        setattr(target, f'{field}_id', keep)
+        target.save()
+
+
+def merge_duplicates(apps, schema_editor):
+    Ingredient = apps.get_model('recepies', 'Ingredient')
+    RecipeIngredient = apps.get_model('recepies', 'RecipeIngredient')
+    ShoppingListIngredient = apps.get_model(
+        'recepies', 'ShoppingListIngredient'
+    )
+    duplicates = Ingredient.objects.values('name', 'units').annotate(
+        keep=Min('pk'), total=Count('pk')
+    ).filter(total__gt=1).order_by()
+    for group in duplicates:
+        ids = list(Ingredient.objects.filter(
+            name=group['name'], units=group['units']
+        ).values_list('pk', flat=True))
+        merge_rows(RecipeIngredient, 'recipe', 'ingredients', group['keep'], ids)
+        merge_rows(
+            ShoppingListIngredient, 'user', 'ingredient', group['keep'], ids
+        )
+        Ingredient.objects.filter(pk__in=ids).exclude(
+            pk=group['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recepies', '0014_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'units'), name='unique_ingredient_name_units'),
+        ),
+    ]
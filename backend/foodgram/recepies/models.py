@@ -1,5 +1,8 @@
+import uuid
+
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from recepies.counters import CounterFieldsMixin
 from users.models import User
 
 
@@ -14,6 +17,11 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингридиент'
         verbose_name_plural = 'Ингридиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'units'], name='unique_ingredient_name_units'
+            ),
+        ]
 
 
 class Tag(models.Model):
@@ -38,7 +46,8 @@ class Tag(models.Model):
         self.validate_hex_color(self.hexcolor)
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
+    counter_fields = ('favorites_count', 'in_carts_count')
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name='Aвтор'
         )
@@ -47,6 +56,10 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipes/images'
     )
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        verbose_name='Варианты изображения'
+        )
     text = models.TextField(verbose_name='Текст рецепта')
     ingredients = models.ManyToManyField(
         Ingredient, through='RecipeIngredient', verbose_name='Ингридиенты'
@@ -59,10 +72,28 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, verbose_name='Дата добавления'
         )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+        )
+    favorites_count = models.PositiveIntegerField(
+        default=0, verbose_name='Добавлений в избранное'
+        )
+    in_carts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Добавлений в списки покупок'
+        )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipe_favorites_idx'
+            ),
+        ]
 
 
 class RecipeIngredient(models.Model):
@@ -83,3 +114,81 @@ class ShoppingList(models.Model):
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+
+
+class ShoppingListIngredient(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='shopping_totals'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name='Ингридиент'
+    )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Ингридиент списка покупок'
+        verbose_name_plural = 'Ингридиенты списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_ingredient'
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """A recipe in the feed of one of its author's subscribers."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата добавления')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_entry_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='feed_entry_user_author_idx'
+            ),
+        ]
+
+
+class ImageUpload(models.Model):
+    """A recipe image uploaded in chunks, see recepies.uploads."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='image_uploads'
+    )
+    size = models.PositiveIntegerField(verbose_name='Размер')
+    received = models.PositiveIntegerField(
+        default=0, verbose_name='Получено'
+    )
+    image_format = models.CharField(
+        max_length=10, blank=True, verbose_name='Формат'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания'
+    )
+
+    class Meta:
+        verbose_name = 'Загрузка изображения'
+        verbose_name_plural = 'Загрузки изображений'
+
+    @property
+    def is_complete(self):
+        return bool(self.image_format)
@@ -0,0 +1,147 @@
+"""Full-text search over recipe names and texts.
+
+PostgreSQL keeps a weighted tsvector in a generated column with a GIN
+index, SQLite an FTS5 table synced by triggers. Both are created by the
+migration and re-checked after every migrate, because SQLite rebuilds a
+table (dropping its triggers) whenever a column is added to it.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+
+FTS_TABLE = 'recepies_recipe_fts'
+
+POSTGRESQL_INSTALL = (
+    """
+    ALTER TABLE recepies_recipe ADD COLUMN IF NOT EXISTS search_vector
+    tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector(%(config)s, coalesce(name, '')), 'A')
+        || setweight(to_tsvector(%(config)s, coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS recipe_search_vector_idx
+    ON recepies_recipe USING gin (search_vector)
+    """,
+)
+POSTGRESQL_UNINSTALL = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    'ALTER TABLE recepies_recipe DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_INSTALL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, text, content='recepies_recipe', content_rowid='id',
+        tokenize='unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_insert
+    AFTER INSERT ON recepies_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_delete
+    AFTER DELETE ON recepies_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_update
+    AFTER UPDATE ON recepies_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+)
+SQLITE_UNINSTALL = (
+    'DROP TRIGGER IF EXISTS recipe_fts_insert',
+    'DROP TRIGGER IF EXISTS recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipe_fts_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def install(connection):
+    """Create the search column or table and index, if missing."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_INSTALL:
+                cursor.execute(sql, {'config': settings.RECIPE_SEARCH_CONFIG})
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master "
+                "WHERE type = 'trigger' AND name LIKE %s",
+                ['recipe_fts_%']
+            )
+            complete = cursor.fetchone()[0] == 3
+            for sql in SQLITE_INSTALL:
+                cursor.execute(sql)
+            if not complete:
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+                )
+
+
+def uninstall(connection):
+    statements = {
+        'postgresql': POSTGRESQL_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    }.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def fts5_query(query):
+    """FTS5 expression matching all words of the query as prefixes."""
+    words = query.replace('"', ' ').split()
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_recipes(queryset, query):
+    """Recipes matching the query, best ranked first.
+
+    The rank is exposed as `search_rank`, higher is better. Databases
+    without full-text support fall back to an unranked substring match.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        params = [settings.RECIPE_SEARCH_CONFIG, query]
+        queryset = queryset.extra(
+            select={
+                'search_rank': (
+                    f'ts_rank(recepies_recipe.search_vector, {tsquery})'
+                ),
+            },
+            select_params=params,
+            where=[f'recepies_recipe.search_vector @@ {tsquery}'],
+            params=params,
+        )
+    elif vendor == 'sqlite':
+        expression = fts5_query(query)
+        if not expression:
+            return queryset.none()
+        queryset = queryset.extra(
+            select={'search_rank': f'-{FTS_TABLE}.rank'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE} MATCH %s',
+                f'{FTS_TABLE}.rowid = recepies_recipe.id',
+            ],
+            params=[expression],
+        )
+    else:
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
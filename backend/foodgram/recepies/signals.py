@@ -0,0 +1,58 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from recepies.cart import lock_recipe, recipe_changed
+from recepies.feed import fan_out
+from recepies.images import needs_processing, schedule
+from recepies.models import Recipe
+from users.models import User
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_cart_totals(sender, instance, **kwargs):
+    recipe_changed(instance, lock_recipe(instance), {})
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if needs_processing(instance):
+        schedule(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    User.objects.filter(
+        pk=instance.author_id, recipes_count__gt=0
+    ).update(recipes_count=F('recipes_count') - 1)
+
+
+@receiver(pre_delete, sender=User)
+def release_user_counters(sender, instance, **kwargs):
+    """Decrement the counters the user's relations took part in.
+
+    The relations themselves go away with the user by cascade, which
+    sends no m2m signals.
+    """
+    Recipe.objects.filter(
+        favorited_by=instance, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+    Recipe.objects.filter(
+        shopping_lists__user=instance, in_carts_count__gt=0
+    ).update(in_carts_count=F('in_carts_count') - 1)
+    User.objects.filter(
+        subscribers=instance, subscribers_count__gt=0
+    ).update(subscribers_count=F('subscribers_count') - 1)
@@ -0,0 +1,7 @@
+from jobs.queue import task
+from recepies import images
+
+
+@task('recepies.process_recipe_image')
+def process_recipe_image(pk):
+    images.process(pk)
@@ -0,0 +1,121 @@
+"""Resumable recipe image uploads.
+
+A client creates an upload with the total size and sends the bytes in
+chunks, each one starting where the previous ended. Chunks are appended
+to a file in IMAGE_UPLOAD_DIR while the request body is read, so memory
+use does not grow with the image. Once the last byte arrives the file
+is checked to be an image; a recipe payload may then reference the
+upload by id instead of carrying the image itself.
+"""
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from recepies.models import ImageUpload
+
+CHUNK_SIZE = 64 * 1024
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class UploadError(Exception):
+    pass
+
+
+class InvalidImage(UploadError):
+    """The completed upload is not an image; it cannot be resumed."""
+
+
+def part_path(upload):
+    return os.path.join(settings.IMAGE_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def create(user, size):
+    if not 0 < size <= settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise UploadError(
+            'Размер должен быть от 1 до '
+            f'{settings.IMAGE_UPLOAD_MAX_SIZE} байт.'
+        )
+    os.makedirs(settings.IMAGE_UPLOAD_DIR, exist_ok=True)
+    upload = ImageUpload.objects.create(user=user, size=size)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+@transaction.atomic
+def append(upload, stream, start, length):
+    """Append `length` bytes of the stream written at offset `start`.
+
+    The row is locked for the write, so two copies of one chunk sent
+    at once are applied one after another and the second is refused.
+    """
+    upload = ImageUpload.objects.select_for_update().get(pk=upload.pk)
+    if upload.is_complete:
+        raise UploadError('Загрузка уже завершена.')
+    if start != upload.received:
+        raise UploadError(f'Ожидается часть с позиции {upload.received}.')
+    if length <= 0 or start + length > upload.size:
+        raise UploadError('Часть выходит за пределы загрузки.')
+    written = 0
+    with open(part_path(upload), 'r+b') as file:
+        file.seek(start)
+        while written < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            file.write(chunk)
+            written += len(chunk)
+        file.truncate()
+    if written != length:
+        raise UploadError('Получено меньше данных, чем заявлено.')
+    upload.received += written
+    if upload.received == upload.size:
+        upload.image_format = identify(part_path(upload))
+    upload.save(update_fields=['received', 'image_format'])
+    return upload
+
+
+def identify(path):
+    """Format of the image in the file, UploadError if it is not one."""
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError,
+            Image.DecompressionBombError):
+        raise InvalidImage('Загруженный файл не является изображением.')
+    if image_format not in FORMATS:
+        raise InvalidImage(f'Формат {image_format} не поддерживается.')
+    return image_format
+
+
+def open_file(upload):
+    """The completed upload as a File to be saved into an ImageField."""
+    return File(
+        open(part_path(upload), 'rb'),
+        name=f'{upload.pk}.{FORMATS[upload.image_format]}'
+    )
+
+
+def discard(upload, file=None):
+    if file is not None:
+        file.close()
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    ImageUpload.objects.filter(pk=upload.pk).delete()
+
+
+def clear_stale(age):
+    """Discard the uploads older than `age`, return their number."""
+    stale = ImageUpload.objects.filter(
+        created_at__lt=timezone.now() - age
+    )
+    count = 0
+    for upload in stale.iterator():
+        discard(upload)
+        count += 1
+    return count
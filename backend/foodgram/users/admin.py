@@ -15,6 +15,7 @@ class UserAdmin(admin.ModelAdmin):
         'bio',
         'role'
     )
+    readonly_fields = User.counter_fields
     empty_value_display = 'значение отсутствует'
     list_editable = ('role',)
     list_filter = ('username', 'role')
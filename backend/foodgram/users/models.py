@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+from recepies.counters import CounterFieldsMixin
 from users.validators import validate_username
 
 USER = 'user'
@@ -7,7 +10,8 @@ MODERATOR = 'moderator'
 ADMIN = 'admin'
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
+    counter_fields = ('recipes_count', 'subscribers_count')
     STATUS_CHOICES = (
         (ADMIN, 'Администратор'),
         (MODERATOR, 'Модератор'),
@@ -46,15 +50,104 @@ class User(AbstractUser):
     subscriptions = models.ManyToManyField(
         'self', related_name='subscribers', symmetrical=False
         )
+    recipes_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество рецептов'
+        )
+    subscribers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество подписчиков'
+        )
+
+    def lock(self):
+        """Lock the user's row until the end of the transaction."""
+        User.objects.select_for_update().filter(pk=self.pk).exists()
+
+    @cached_property
+    def subscription_ids(self):
+        return frozenset(self.subscriptions.values_list('id', flat=True))
+
+    @cached_property
+    def favorite_ids(self):
+        return frozenset(self.favorite_recipes.values_list('id', flat=True))
+
+    @cached_property
+    def cart_ids(self):
+        return frozenset(
+            self.shoppinglist_set.filter(recipes__isnull=False).values_list(
+                'recipes', flat=True
+            )
+        )
+
+    def forget_relations(self):
+        """Drop the loaded id sets after the relations have changed.
+
+        The sets are loaded once per instance, and the instance of the
+        requesting user lives as long as the request.
+        """
+        for name in ('subscription_ids', 'favorite_ids', 'cart_ids'):
+            self.__dict__.pop(name, None)
 
+    @transaction.atomic
     def subscribe_to_user(self, target_user):
+        self.lock()
+        if self.subscriptions.filter(pk=target_user.pk).exists():
+            return False
+        from recepies.feed import backfill
+
         self.subscriptions.add(target_user)
+        self.forget_relations()
+        User.objects.filter(pk=target_user.pk).update(
+            subscribers_count=F('subscribers_count') + 1
+        )
+        backfill(self, target_user)
+        return True
 
+    @transaction.atomic
     def unsubscribe_from_user(self, target_user):
+        self.lock()
+        if not self.subscriptions.filter(pk=target_user.pk).exists():
+            return False
+        from recepies.feed import trim
+
         self.subscriptions.remove(target_user)
+        self.forget_relations()
+        User.objects.filter(
+            pk=target_user.pk, subscribers_count__gt=0
+        ).update(subscribers_count=F('subscribers_count') - 1)
+        trim(self, target_user)
+        return True
+
+    @transaction.atomic
+    def add_favorite(self, recipe):
+        self.lock()
+        if self.favorite_recipes.filter(pk=recipe.pk).exists():
+            return False
+        self.favorite_recipes.add(recipe)
+        self.forget_relations()
+        type(recipe).objects.filter(pk=recipe.pk).update(
+            favorites_count=F('favorites_count') + 1
+        )
+        return True
+
+    @transaction.atomic
+    def remove_favorite(self, recipe):
+        self.lock()
+        if not self.favorite_recipes.filter(pk=recipe.pk).exists():
+            return False
+        self.favorite_recipes.remove(recipe)
+        self.forget_relations()
+        type(recipe).objects.filter(
+            pk=recipe.pk, favorites_count__gt=0
+        ).update(favorites_count=F('favorites_count') - 1)
+        return True
 
     def is_subscribed_to(self, target_user):
-        return self.subscriptions.filter(id=target_user.id).exists()
+        return target_user.pk in self.subscription_ids
+
+    def has_favorited(self, recipe):
+        return recipe.pk in self.favorite_ids
+
+    def has_in_cart(self, recipe):
+        return recipe.pk in self.cart_ids
 
     @property
     def subscribed_users(self):